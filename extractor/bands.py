@@ -0,0 +1,18 @@
+import librosa
+import numpy as np
+
+# Frequency-band boundaries in Hz: bass 20-250, mids 250-4000, treble 4000-20000
+BAND_EDGES_HZ = (20, 250, 4000, 20000)
+
+
+def mel_band_edges(n_mels, sr):
+    """
+    Maps BAND_EDGES_HZ to mel-row indices for a spectrogram with n_mels bands up to Nyquist.
+    Shared by both extractors so their bass/mid/treble energies agree for the same file.
+    The treble band runs up to 20 kHz or the top mel band (Nyquist), whichever is lower.
+
+    Returns:
+        np.ndarray: Four row indices (e0, e1, e2, e3); band k spans rows edges[k]:edges[k+1].
+    """
+    freqs = librosa.mel_frequencies(n_mels=n_mels, fmin=0, fmax=sr / 2)
+    return np.searchsorted(freqs, BAND_EDGES_HZ, side='right')
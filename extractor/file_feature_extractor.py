@@ -2,106 +2,386 @@ import librosa
 import librosa.display
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import soundfile as sf
+import soxr
 from sklearn.cluster import AgglomerativeClustering
+from threadpoolctl import threadpool_limits
+from bands import mel_band_edges
 
+import functools
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+# Default location for Song's on-disk feature cache
+FEATURE_CACHE_DIR = Path.home() / '.cache' / 'soundbits' / 'features'
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to plain numpy
+    njit = None
+
+
+def _load_audio(file_path, sr):
+    """
+    Decodes an audio file to a mono float32 signal at the given sample rate.
+    Uses libsndfile + soxr directly, falling back to librosa.load for codecs
+    the installed libsndfile can't decode.
+    """
+    try:
+        data, orig_sr = sf.read(file_path, dtype='float32', always_2d=False)
+    except sf.LibsndfileError:
+        return librosa.load(file_path, sr=sr, mono=True)
+
+    if data.ndim == 2:
+        data = data.mean(axis=1)
+    if orig_sr != sr:
+        data = soxr.resample(data, orig_sr, sr)
+    return data, sr
+
+
+def _stream_melspec(file_path, sr, n_fft, hop_length, n_mels=128, block_frames=256):
+    """
+    Computes the mel power spectrogram and per-frame RMS block by block, so neither
+    the whole waveform nor the whole STFT is ever held in memory. Frames line up with
+    librosa.stft(center=True) and its default zero padding.
+
+    Returns:
+        tuple: (melspec, rms, n_samples) at the given sample rate.
+    """
+    mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels)
+    mel_blocks, rms_blocks = [], []
+    n_samples = 0
+
+    def consume(buf):
+        # Transform every complete frame in buf and return the samples still needed by the next one
+        n_frames = 1 + (len(buf) - n_fft) // hop_length if len(buf) >= n_fft else 0
+        if n_frames:
+            S_mag = np.abs(librosa.stft(buf[:(n_frames - 1) * hop_length + n_fft],
+                                        n_fft=n_fft, hop_length=hop_length, center=False))
+            mel_blocks.append(mel_basis @ S_mag**2)
+            rms_blocks.append(librosa.feature.rms(S=S_mag, frame_length=n_fft, hop_length=hop_length)[0])
+        return buf[n_frames * hop_length:]
+
+    # Half a window of leading zeros reproduces center=True padding
+    buf = np.zeros(n_fft // 2, dtype=np.float32)
+    with sf.SoundFile(file_path) as f:
+        resampler = soxr.ResampleStream(f.samplerate, sr, 1, dtype='float32') if f.samplerate != sr else None
+        # Read until the decoder runs dry instead of trusting f.frames: libsndfile's MP3 frame
+        # count can overshoot, and SoundFile.blocks would pad the tail with a stale block
+        while True:
+            block = f.read(hop_length * block_frames, dtype='float32', always_2d=True)
+            if not len(block):
+                break
+            chunk = block.mean(axis=1)
+            if resampler:
+                chunk = resampler.resample_chunk(chunk)
+            n_samples += len(chunk)
+            buf = consume(np.concatenate([buf, chunk]))
+        if resampler:
+            chunk = resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+            n_samples += len(chunk)
+            buf = np.concatenate([buf, chunk])
+    consume(np.concatenate([buf, np.zeros(n_fft // 2, dtype=np.float32)]))
+
+    return np.hstack(mel_blocks), np.concatenate(rms_blocks), n_samples
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _agg_bands(melspec, e0, e1, e2, e3):
+        """
+        Sums the bass (e0:e1), mid (e1:e2) and treble (e2:e3) mel rows per frame,
+        and returns each band's mean and std alongside. Rows are walked in memory
+        order, and the std is two-pass to avoid E[x^2] - mean^2 cancellation.
+        Serial on purpose: analyze_many already runs one song per core.
+        """
+        n_frames = melspec.shape[1]
+        edges = (e0, e1, e2, e3)
+        bands = np.zeros((3, n_frames))
+        for k in range(3):
+            for i in range(edges[k], edges[k + 1]):
+                for t in range(n_frames):
+                    bands[k, t] += melspec[i, t]
+
+        means = np.zeros(3)
+        stds = np.zeros(3)
+        if n_frames > 0:
+            for k in range(3):
+                total = 0.0
+                for t in range(n_frames):
+                    total += bands[k, t]
+                means[k] = total / n_frames
+                sq_dev = 0.0
+                for t in range(n_frames):
+                    d = bands[k, t] - means[k]
+                    sq_dev += d * d
+                stds[k] = np.sqrt(sq_dev / n_frames)
+        bands = bands.astype(melspec.dtype)
+        return bands[0], bands[1], bands[2], means, stds
+else:
+    def _agg_bands(melspec, e0, e1, e2, e3):
+        """
+        Sums the bass (e0:e1), mid (e1:e2) and treble (e2:e3) mel rows per frame,
+        and returns each band's mean and std alongside.
+        """
+        if melspec.shape[1] == 0:
+            empty = np.zeros(0, dtype=melspec.dtype)
+            return empty, empty, empty, np.zeros(3), np.zeros(3)
+        bands = np.add.reduceat(melspec[:e3], [e0, e1, e2], axis=0)
+        return bands[0], bands[1], bands[2], bands.mean(axis=1), bands.std(axis=1)
+
+
+def _pin_blas():
+    """
+    Worker initializer for analyze_many: limits BLAS/OpenMP to one thread per
+    process so parallel songs don't oversubscribe the cores.
+    """
+    os.environ['OMP_NUM_THREADS'] = '1'
+    threadpool_limits(1)
+
+
 class Song:
     """
     A class to hold and extract key audio features from a song file
     for AI DJ applications.
     """
-    def __init__(self, file_path: str):
+    # Attributes not written to the feature cache: the Song's configuration and
+    # waveform-sized signals, which are cheaper to decode again than to store
+    _UNCACHED_ATTRS = ('file_path', 'n_fft', 'hop_length', 'stream', 'sr', 'use_cache', 'cache_dir',
+                       'y', 'y_harmonic', 'y_percussive')
+
+    def __init__(self, file_path: str, sr=11025, n_fft=2048, hop_length=512, stream=False,
+                 use_cache=True, cache_dir: Path = FEATURE_CACHE_DIR):
         """
         Initializes the Song object by loading the audio and extracting features.
 
         Args:
             file_path (str): The path to the audio file.
+            sr (int): The sample rate to analyze at. 11025 Hz is enough for the
+                band energies, beats and MFCC/chroma, at half the cost of 22050 Hz.
+            n_fft (int): The number of samples in an FFT window.
+            hop_length (int): The number of samples between successive frames.
+            stream (bool): Compute the spectral features block by block from the file
+                instead of holding the whole waveform and STFT in memory. Meant for long
+                mixes; the waveform is only decoded in full where a step needs the whole
+                signal (HPSS, chroma, plotting) and isn't kept on the instance.
+            use_cache (bool): Reuse features saved by a previous run on the same, unchanged
+                file, and save them after a fresh analysis.
+            cache_dir (Path): Where cached features are stored.
         """
         print(f"Analyzing '{file_path}'...")
         self.file_path = file_path
-        
-        # Load audio with a standard sample rate for consistency
-        self.y, self.sr = librosa.load(file_path, sr=22050)
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.stream = stream
+        self.sr = sr
+        self.y = None
+        self.use_cache = use_cache
+        self.cache_dir = Path(cache_dir)
+
+        if use_cache and self._load_cached_features():
+            print("Loaded cached analysis.")
+            return
+
+        if not stream:
+            # Load audio (mono) at the requested analysis sample rate for consistency
+            self.y, self.sr = _load_audio(file_path, sr)
+            # Keep everything in float32; librosa preserves it, halving memory traffic vs float64
+            self.y = self.y.astype(np.float32, copy=False)
         
         # --- Extract all features ---
         self._extract_features()
+        if use_cache:
+            self._save_cached_features()
         print("Analysis complete.")
 
+    def _cache_path(self):
+        """
+        Cache file for this song. The key changes whenever the file is modified
+        or the analysis parameters differ.
+        """
+        stat = os.stat(self.file_path)
+        key = hashlib.blake2b(
+            f"{stat.st_size}-{stat.st_mtime_ns}-{self.sr}-{self.n_fft}-{self.hop_length}".encode()
+        ).hexdigest()[:16]
+        return self.cache_dir / f"{Path(self.file_path).stem}-{key}.npz"
+
+    def _load_cached_features(self):
+        """Restores extracted features from the cache. Returns False on a cache miss."""
+        path = self._cache_path()
+        if not path.exists():
+            return False
+        with np.load(path) as cached:
+            # Scalars were saved as 0-d arrays; hand them back as plain Python numbers
+            self.__dict__.update({k: v.item() if v.ndim == 0 else v for k, v in cached.items()})
+        return True
+
+    def _save_cached_features(self):
+        """Writes the extracted features to the cache atomically (write to a temp file, then rename)."""
+        path = self._cache_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        features = {k: v for k, v in self.__dict__.items() if k not in self._UNCACHED_ATTRS}
+        tmp_path = path.with_suffix('.tmp.npz')
+        np.savez(tmp_path, **features)
+        os.replace(tmp_path, path)
+
     def _extract_features(self):
         """
-        Private method to run all feature extraction processes.
+        Private method to run the feature extraction needed for the feature vector.
+        HPSS, MFCCs, chroma and the structural segmentation are lazy properties that
+        are only computed when first accessed.
         """
-        # --- 1. Global Features (song-wide) ---
-        self.duration = librosa.get_duration(y=self.y, sr=self.sr)
-        self.rms_energy = np.mean(librosa.feature.rms(y=self.y))
+        # --- 1. Mel bands and global features ---
+        band_means, band_stds = self._compute_mel_bands()
 
         # --- 2. Temporal Features (time-based) ---
-        # Call beat_track once for efficiency
-        tempo, beat_frames = librosa.beat.beat_track(y=self.y, sr=self.sr)
+        self._compute_beats()
+
+        # --- 3. Vector Representation ---
+        # Create a simple, aggregated feature vector for quick comparisons
+        # (band means, then band standard deviations for dynamics)
+        self.feature_vector = np.concatenate([[self.tempo, self.rms_energy], band_means, band_stds])
+
+    def _signal(self):
+        """
+        Returns the waveform, decoding it again if it isn't held on the instance
+        (streaming mode or a cache hit).
+        """
+        return self.y if self.y is not None else _load_audio(self.file_path, self.sr)[0]
+
+    def _compute_mel_bands(self):
+        """
+        Computes the mel-spectrogram, RMS energy, duration and bass/mid/treble band energies.
+
+        Returns:
+            tuple: (band_means, band_stds) for the feature vector.
+        """
+        if self.stream:
+            # Mel power and RMS are accumulated block by block; the full STFT never exists
+            self.melspec, rms, n_samples = _stream_melspec(self.file_path, self.sr, self.n_fft, self.hop_length)
+        else:
+            # Compute the STFT once and derive every spectral feature here from it,
+            # rather than letting each librosa call run its own STFT over self.y
+            S_mag = np.abs(librosa.stft(self.y, n_fft=self.n_fft, hop_length=self.hop_length))
+            # Mel-spectrogram for frequency analysis
+            self.melspec = librosa.feature.melspectrogram(S=S_mag**2, sr=self.sr)
+            rms = librosa.feature.rms(S=S_mag, frame_length=self.n_fft, hop_length=self.hop_length)
+            n_samples = len(self.y)
+            del S_mag
+
+        # Convert to dB once; shared by the onset envelope, the MFCCs and plot_features
+        self.melspec_db = librosa.power_to_db(self.melspec, ref=np.max)
+
+        # Global Features (song-wide)
+        self.duration = n_samples / self.sr
+        self.rms_energy = np.mean(rms)
+
+        # Get energy for bass, mids, and treble bands over time.
+        # Map the band edges (Hz) to mel rows once, then sum all three bands in one pass,
+        # which also yields the per-band means/stds used in the feature vector.
+        e0, e1, e2, e3 = mel_band_edges(self.melspec.shape[0], self.sr)
+        (self.bass_energy, self.mid_energy, self.treble_energy,
+         band_means, band_stds) = _agg_bands(np.ascontiguousarray(self.melspec), e0, e1, e2, e3)
+        return band_means, band_stds
+
+    def _compute_beats(self):
+        """Computes tempo, beat times and onset times from a shared onset envelope."""
+        # A single onset envelope feeds both the beat tracker and the onset detector
+        onset_env = librosa.onset.onset_strength(S=self.melspec_db, sr=self.sr)
+        tempo, beat_frames = librosa.beat.beat_track(onset_envelope=onset_env, sr=self.sr, hop_length=self.hop_length)
         print(f"Tempo: {tempo}")
         print(f"Beat frames: {beat_frames}")
         # FIX: Ensure tempo is a scalar by taking the mean, in case beat_track returns an array
-        self.tempo = np.mean(tempo)
-        self.beats = librosa.frames_to_time(beat_frames, sr=self.sr)
-        self.onsets = librosa.onset.onset_detect(y=self.y, sr=self.sr, units='time')
+        self.tempo = float(np.mean(tempo))
+        self.beats = librosa.frames_to_time(beat_frames, sr=self.sr, hop_length=self.hop_length)
+        self.onsets = librosa.onset.onset_detect(onset_envelope=onset_env, sr=self.sr, hop_length=self.hop_length, units='time')
 
-        # --- 3. Spectral & Component Features ---
-        # Separate into harmonic (vocals, melody) and percussive (drums)
-        self.y_harmonic, self.y_percussive = librosa.effects.hpss(self.y)
+    def _compute_hpss(self):
+        """Separates the harmonic (vocals, melody) and percussive (drums) components."""
+        y = self._signal()
+        # Decompose the STFT directly; only the inverse transforms remain
+        D_harmonic, D_percussive = librosa.decompose.hpss(librosa.stft(y, n_fft=self.n_fft, hop_length=self.hop_length))
+        self.y_harmonic = librosa.istft(D_harmonic, hop_length=self.hop_length, length=len(y))
+        self.y_percussive = librosa.istft(D_percussive, hop_length=self.hop_length, length=len(y))
 
-        # Mel-spectrogram for frequency analysis
-        self.melspec = librosa.feature.melspectrogram(y=self.y, sr=self.sr)
-        
-        # Get energy for bass, mids, and treble bands over time
-        self.bass_energy = self._get_spectral_band_energy(self.melspec, (20, 250))
-        self.mid_energy = self._get_spectral_band_energy(self.melspec, (250, 4000))
-        self.treble_energy = self._get_spectral_band_energy(self.melspec, (4000, 20000))
-        
-        # --- 4. Structural Features ---
-        # Use MFCCs and a recurrence matrix to find structurally similar segments
-        # This is a common way to approximate sections like verse/chorus
-        mfccs = librosa.feature.mfcc(y=self.y, sr=self.sr)
-        chroma = librosa.feature.chroma_cqt(y=self.y, sr=self.sr)
-        stacked_features = np.vstack([mfccs, chroma])
+    @functools.cached_property
+    def y_harmonic(self):
+        """Harmonic component of the waveform, separated on first access."""
+        self._compute_hpss()
+        return self.__dict__['y_harmonic']
+
+    @functools.cached_property
+    def y_percussive(self):
+        """Percussive component of the waveform, separated on first access."""
+        self._compute_hpss()
+        return self.__dict__['y_percussive']
+
+    @functools.cached_property
+    def mfccs(self):
+        """MFCCs derived from the cached dB mel-spectrogram."""
+        return librosa.feature.mfcc(S=self.melspec_db, sr=self.sr).astype(np.float32, copy=False)
+
+    @functools.cached_property
+    def chroma(self):
+        """Chroma from a constant-Q transform, so it cannot reuse the mel-spectrogram."""
+        return librosa.feature.chroma_cqt(y=self._signal(), sr=self.sr, hop_length=self.hop_length).astype(np.float32, copy=False)
+
+    def _compute_structure(self):
+        """
+        Uses MFCCs, chroma and a recurrence graph to find structurally similar segments.
+        This is a common way to approximate sections like verse/chorus.
+        """
+        stacked_features = np.vstack([self.mfccs, self.chroma]).astype(np.float32, copy=False)
         
-        R = librosa.segment.recurrence_matrix(stacked_features, width=5, mode='affinity', sym=True)
+        # Sparse k-NN recurrence graph: only mutual neighbours are stored, not a dense N x N matrix
+        R = librosa.segment.recurrence_matrix(stacked_features, width=5, mode='connectivity', sym=True, sparse=True)
         
         # Use clustering to find segment boundaries
         n_segments = 8 # You can tune this number
-        clusterer = AgglomerativeClustering(n_clusters=n_segments, linkage='ward')
-        # Use (1 - R) because clustering works on distances, and affinity is a similarity measure
-        segment_labels = clusterer.fit_predict(1 - R)
+        # Ward runs on the frame features themselves, restricted to merges along the recurrence graph
+        clusterer = AgglomerativeClustering(n_clusters=n_segments, linkage='ward', connectivity=R)
+        segment_labels = clusterer.fit_predict(stacked_features.T)
         # Find the points where the label changes
-        boundaries = np.where(np.diff(segment_labels))[0]
-        self.segment_boundaries = librosa.frames_to_time(boundaries, sr=self.sr)
+        boundaries = np.flatnonzero(np.not_equal(segment_labels[1:], segment_labels[:-1]))
+        self.segment_boundaries = librosa.frames_to_time(boundaries, sr=self.sr, hop_length=self.hop_length)
         self.segment_labels = segment_labels
 
-        # --- 5. Vector Representation ---
-        # Create a simple, aggregated feature vector for quick comparisons
-        self.feature_vector = np.array([
-            self.tempo,
-            self.rms_energy,
-            np.mean(self.bass_energy),
-            np.mean(self.mid_energy),
-            np.mean(self.treble_energy),
-            np.std(self.bass_energy), # Add standard deviation for dynamics
-            np.std(self.mid_energy),
-            np.std(self.treble_energy)
-        ])
-
-    def _get_spectral_band_energy(self, melspec, freq_range_hz):
-        """Helper to calculate energy in a specific frequency band."""
-        freqs = librosa.mel_frequencies(n_mels=melspec.shape[0], fmin=0, fmax=self.sr/2)
-        
-        # Find the mel bands corresponding to the frequency range
-        start_band = np.argmin(np.abs(freqs - freq_range_hz[0]))
-        end_band = np.argmin(np.abs(freqs - freq_range_hz[1]))
-        
-        # Sum the energy in those bands for each time frame
-        band_energy = np.sum(melspec[start_band:end_band+1, :], axis=0)
-        return band_energy
-        
+    @functools.cached_property
+    def segment_labels(self):
+        """Structural segment label per frame, clustered on first access."""
+        self._compute_structure()
+        return self.__dict__['segment_labels']
+
+    @functools.cached_property
+    def segment_boundaries(self):
+        """Times (s) where the structural segment changes, clustered on first access."""
+        self._compute_structure()
+        return self.__dict__['segment_boundaries']
+
+    @classmethod
+    def analyze_many(cls, paths, max_workers=None, **kwargs):
+        """
+        Analyzes several audio files in parallel, one process per song.
+
+        Args:
+            paths (list): The paths to the audio files.
+            max_workers (int): Number of worker processes. Defaults to half the CPU count.
+            **kwargs: Passed through to the Song constructor.
+
+        Returns:
+            list: The Song objects, in the same order as paths.
+        """
+        if max_workers is None:
+            max_workers = max(1, (os.cpu_count() or 2) // 2)
+
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_pin_blas) as executor:
+            futures = [executor.submit(cls, path, **kwargs) for path in paths]
+            return [future.result() for future in futures]
+
     def summarize(self):
         """Prints a summary of the extracted features."""
         print("\n--- Song Analysis Summary ---")
@@ -120,11 +400,27 @@ class Song:
         """
         Creates and displays a comprehensive plot of the song's main features.
         """
-        fig, ax = plt.subplots(nrows=4, ncols=1, sharex=True, figsize=(15, 20))
+        # Nothing to show or save: skip the matplotlib work entirely
+        if not show and plot_path is None:
+            return
+
+        # Streaming mode doesn't keep the waveform around, so decode it again for the plot
+        y = self._signal()
+
+        # Cap the number of waveform samples handed to matplotlib
+        step = max(1, len(y) // 100000)
+
+        if show:
+            fig, ax = plt.subplots(nrows=4, ncols=1, sharex=True, figsize=(15, 20))
+        else:
+            # Saving only: draw on a standalone Agg figure, leaving pyplot's backend and open figures alone
+            fig = Figure(figsize=(15, 20))
+            FigureCanvasAgg(fig)
+            ax = fig.subplots(nrows=4, ncols=1, sharex=True)
         fig.suptitle('Song Feature Analysis', fontsize=16)
 
         # --- Plot 1: Waveform with Beats and Onsets ---
-        librosa.display.waveshow(self.y, sr=self.sr, ax=ax[0], alpha=0.6, label='Waveform')
+        librosa.display.waveshow(y[::step], sr=self.sr / step, ax=ax[0], alpha=0.6, label='Waveform')
         ax[0].vlines(self.beats, -1, 1, color='r', linestyle='--', label='Beats')
         ax[0].vlines(self.onsets, -1, 1, color='g', linestyle=':', label='Onsets')
         ax[0].set_title('Waveform, Beats, and Onsets')
@@ -133,7 +429,7 @@ class Song:
         ax[0].grid(True)
 
         # --- Plot 2: Spectral Band Energy ---
-        times = librosa.times_like(self.bass_energy, sr=self.sr)
+        times = librosa.times_like(self.bass_energy, sr=self.sr, hop_length=self.hop_length)
         ax[1].plot(times, self.bass_energy, label='Bass Energy', color='b')
         ax[1].plot(times, self.mid_energy, label='Mid Energy', color='g')
         ax[1].plot(times, self.treble_energy, label='Treble Energy', color='r')
@@ -143,28 +439,27 @@ class Song:
         ax[1].grid(True)
         
         # --- Plot 3: Harmonic vs. Percussive Components ---
-        librosa.display.waveshow(self.y_harmonic, sr=self.sr, ax=ax[2], alpha=0.6, label='Harmonic')
-        librosa.display.waveshow(self.y_percussive, sr=self.sr, ax=ax[2], alpha=0.6, color='r', label='Percussive')
+        librosa.display.waveshow(self.y_harmonic[::step], sr=self.sr / step, ax=ax[2], alpha=0.6, label='Harmonic')
+        librosa.display.waveshow(self.y_percussive[::step], sr=self.sr / step, ax=ax[2], alpha=0.6, color='r', label='Percussive')
         ax[2].set_title('Harmonic vs. Percussive Components')
         ax[2].set_ylabel('Amplitude')
         ax[2].legend()
         ax[2].grid(True)
 
         # --- Plot 4: Mel Spectrogram with Structural Segments ---
-        melspec_db = librosa.power_to_db(self.melspec, ref=np.max)
-        librosa.display.specshow(melspec_db, sr=self.sr, x_axis='time', y_axis='mel', ax=ax[3])
+        librosa.display.specshow(self.melspec_db, sr=self.sr, x_axis='time', y_axis='mel', ax=ax[3])
         ax[3].vlines(self.segment_boundaries, 0, self.sr/2, color='w', linestyle='--', label='Segments')
         ax[3].set_title('Mel Spectrogram and Structural Segments')
         ax[3].set_ylabel('Frequency (Mel)')
         ax[3].legend()
 
-        plt.xlabel('Time (s)')
-        plt.tight_layout(rect=[0, 0.03, 1, 0.95]) # Adjust layout to make room for suptitle
-        
-        if plot_path: plt.savefig(plot_path / f"{Path(self.file_path).stem}.png")
-        if show: plt.show()
+        ax[3].set_xlabel('Time (s)')
+        fig.tight_layout(rect=[0, 0.03, 1, 0.95]) # Adjust layout to make room for suptitle
         
-        plt.close()
+        if plot_path: fig.savefig(plot_path / f"{Path(self.file_path).stem}.png")
+        if show:
+            plt.show()
+            plt.close(fig)
 
 
 # --- Example Usage ---
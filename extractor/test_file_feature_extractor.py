@@ -0,0 +1,29 @@
+import unittest
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+from file_feature_extractor import Song, _load_audio, _stream_melspec
+
+SAMPLE_MP3 = Path(__file__).resolve().parent.parent / 'samples' / 'luxury-fashion-348904.mp3'
+
+class TestStreamMelspec(unittest.TestCase):
+    def test_stream_matches_full_mode(self):
+        """Streaming decodes exactly the samples sf.read does, so both modes yield the same frames."""
+        full = Song(str(SAMPLE_MP3), use_cache=False)
+        streamed = Song(str(SAMPLE_MP3), stream=True, use_cache=False)
+        self.assertEqual(streamed.melspec.shape, full.melspec.shape)
+        self.assertAlmostEqual(streamed.duration, full.duration, places=6)
+
+    def test_stream_sample_count(self):
+        """No stale samples are appended past the end of the decoded audio."""
+        sr = sf.info(str(SAMPLE_MP3)).samplerate
+        y, _ = _load_audio(str(SAMPLE_MP3), sr)
+        melspec, rms, n_samples = _stream_melspec(str(SAMPLE_MP3), sr, 2048, 512)
+        self.assertEqual(n_samples, len(y))
+        self.assertEqual(melspec.shape[1], 1 + len(y) // 512)
+        self.assertEqual(len(rms), melspec.shape[1])
+        self.assertTrue(np.isfinite(melspec).all())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,46 +2,128 @@ import torch
 import torchaudio
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from sklearn.cluster import AgglomerativeClustering
-from scipy.spatial.distance import pdist, squareform
+from sklearn.neighbors import kneighbors_graph
 import librosa # Kept for specific high-level functions not in torchaudio
+import functools
 from pathlib import Path
+from bands import mel_band_edges
+
+
+def _load_waveform(file_path, sr):
+    """
+    Loads an audio file as a mono float32 (1, T) tensor at the given sample rate.
+    """
+    # --- Load Audio with Torchaudio ---
+    # This returns a tensor and the sample rate
+    waveform, orig_sr = torchaudio.load(file_path)
+
+    # --- Ensure Mono for consistency ---
+    # If stereo, average the channels. Most audio analysis is done in mono.
+    if waveform.shape[0] > 1:
+        waveform = torch.mean(waveform, dim=0, keepdim=True)
+
+    # --- Resample to the analysis rate ---
+    # Done after the mono mix so only one channel is resampled
+    if orig_sr != sr:
+        waveform = torchaudio.transforms.Resample(orig_freq=orig_sr, new_freq=sr)(waveform)
+    return waveform.to(torch.float32)
+
+
+class _MelFeatures(torch.nn.Module):
+    """
+    The power spectrum -> mel -> dB -> MFCC chain as one module, so it compiles to a single graph.
+    The STFT runs eagerly in stft(): the compiler doesn't fuse FFTs anyway, and callers reuse
+    the complex spectrum (e.g. for HPSS).
+    """
+    def __init__(self, sr, n_fft, hop_length, n_mels, n_mfcc=13):
+        super().__init__()
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        # Hann window and mel filterbank are built once and kept as buffers; together with the
+        # one-sided STFT below this matches torchaudio.transforms.MelSpectrogram's defaults
+        self.register_buffer('window', torch.hann_window(n_fft))
+        self.register_buffer('mel_fb', torchaudio.functional.melscale_fbanks(
+            n_freqs=n_fft // 2 + 1, f_min=0.0, f_max=sr / 2, n_mels=n_mels, sample_rate=sr
+        ))
+        self.to_db = torchaudio.transforms.AmplitudeToDB(stype='power', top_db=80)
+        # The same DCT torchaudio.transforms.MFCC applies, minus its second STFT and mel projection
+        self.register_buffer('dct_mat', torchaudio.functional.create_dct(n_mfcc, n_mels, 'ortho'))
+
+    def stft(self, waveform):
+        # Real-input (one-sided) FFT: only the n_fft // 2 + 1 non-redundant bins are computed
+        return torch.stft(waveform, n_fft=self.n_fft, hop_length=self.hop_length, window=self.window,
+                          center=True, pad_mode='reflect', onesided=True, return_complex=True)
+
+    def forward(self, power):
+        melspec = torch.matmul(power.transpose(-1, -2), self.mel_fb).transpose(-1, -2)
+        # Add a channel dim so top_db clipping is relative to each song's own peak
+        melspec_db = self.to_db(melspec.unsqueeze(-3)).squeeze(-3)
+        mfccs = torch.matmul(melspec_db.transpose(-1, -2), self.dct_mat).transpose(-1, -2)
+        return melspec, melspec_db, mfccs
+
+
+# Set to False to always run the mel/dB/MFCC chain eagerly
+USE_TORCH_COMPILE = True
+
+
+@functools.lru_cache(maxsize=None)
+def _get_transforms(sr, n_fft, hop_length, n_mels, device):
+    """
+    Builds the compiled mel/dB/MFCC chain once per signature and reuses it across songs.
+    The first call for a signature pays the compile cost; later songs reuse the graph.
+    Falls back to the eager module where compilation isn't available (e.g. no C++ toolchain).
+    """
+    module = _MelFeatures(sr, n_fft, hop_length, n_mels).to(device)
+    if not USE_TORCH_COMPILE:
+        return module
+    # dynamic=True: song lengths vary, so avoid recompiling for every new length
+    compiled = torch.compile(module, dynamic=True)
+    # torch.compile is lazy, so compile errors only surface on the first call; trigger it here
+    try:
+        with torch.no_grad():
+            compiled(torch.zeros(1, n_fft // 2 + 1, 8, device=device))
+    except Exception as e:
+        print(f"torch.compile unavailable ({type(e).__name__}: {e}); using the eager mel chain.")
+        return module
+    return compiled
+
 
 class SongTorchaudio:
     """
     A class to hold and extract key audio features from a song file
     for AI DJ applications, using torchaudio as the primary backend.
     """
-    def __init__(self, file_path: str, n_fft=2048, hop_length=512, n_mels=128):
+    def __init__(self, file_path: str, sr=11025, n_fft=2048, hop_length=512, n_mels=128, device=None):
         """
         Initializes the Song object by loading the audio and extracting features.
 
         Args:
             file_path (str): The path to the audio file.
+            sr (int): The sample rate to resample to before analysis.
             n_fft (int): The number of samples in an FFT window.
             hop_length (int): The number of samples between successive frames.
             n_mels (int): The number of mel bands to generate.
+            device (str): Torch device for the spectral transforms. Defaults to 'cuda' when available.
         """
         print(f"Analyzing '{file_path}' with torchaudio...")
         self.file_path = file_path
         self.n_fft = n_fft
         self.hop_length = hop_length
         self.n_mels = n_mels
+        self.device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
 
-        # --- Load Audio with Torchaudio ---
-        # This returns a tensor and the sample rate
-        waveform, self.sr = torchaudio.load(file_path)
-
-        # --- Ensure Mono for consistency ---
-        # If stereo, average the channels. Most audio analysis is done in mono.
-        if waveform.shape[0] > 1:
-            self.waveform = torch.mean(waveform, dim=0, keepdim=True)
-        else:
-            self.waveform = waveform
+        self.waveform = _load_waveform(file_path, sr)
+        self.sr = sr
 
         # For librosa functions, we'll need a numpy representation
         self.y_np = self.waveform.squeeze().numpy()
 
+        # Keep a device-resident copy for the STFT/mel/MFCC transforms
+        self.waveform_device = self.waveform.to(self.device)
+
         # --- Extract all features ---
         self._extract_features()
         print("Analysis complete.")
@@ -54,66 +136,70 @@ class SongTorchaudio:
         self.duration = self.waveform.shape[1] / self.sr
         
         # Use torchaudio's RMS transform
-        rms_transform = torchaudio.transforms.RMS(frame_length=self.n_fft, hop_length=self.hop_length)
-        self.rms_energy = rms_transform(self.waveform).mean().item()
+        rms_transform = torchaudio.transforms.RMS(frame_length=self.n_fft, hop_length=self.hop_length).to(self.device)
+        self.rms_energy = rms_transform(self.waveform_device).mean().item()
+
+        # Mel-spectrogram, its dB version and MFCCs from the cached compiled chain on self.device.
+        # The dB version is shared by the onset envelope, the MFCCs and plot_features.
+        mel_features = _get_transforms(self.sr, self.n_fft, self.hop_length, self.n_mels, self.device)
+        stft = mel_features.stft(self.waveform_device)
+        melspec, melspec_db, mfccs = mel_features(stft.abs().pow_(2))
+        # Squeeze batch dim and bring back to the CPU for the numpy-based steps below
+        self.melspec = melspec.squeeze(0).cpu()
+        self.melspec_db = melspec_db.squeeze(0).cpu()
 
         # --- 2. Temporal Features (using librosa for high-level analysis) ---
         # Torchaudio does not have a direct, high-level beat tracker.
         # Librosa's implementation is sophisticated and well-suited for this.
-        tempo, beat_frames = librosa.beat.beat_track(y=self.y_np, sr=self.sr, hop_length=self.hop_length)
-        self.tempo = np.mean(tempo)
+        # Build one onset envelope from the torchaudio mel-spectrogram and share it,
+        # so librosa does not recompute its own STFT for each call.
+        onset_env = librosa.onset.onset_strength(S=self.melspec_db.numpy(), sr=self.sr)
+        tempo, beat_frames = librosa.beat.beat_track(onset_envelope=onset_env, sr=self.sr, hop_length=self.hop_length)
+        self.tempo = float(np.mean(tempo))
         self.beats = librosa.frames_to_time(beat_frames, sr=self.sr, hop_length=self.hop_length)
-        self.onsets = librosa.onset.onset_detect(y=self.y_np, sr=self.sr, hop_length=self.hop_length, units='time')
+        self.onsets = librosa.onset.onset_detect(onset_envelope=onset_env, sr=self.sr, hop_length=self.hop_length, units='time')
 
         # --- 3. Spectral & Component Features ---
         # HPSS (Harmonic-Percussive Source Separation) is another complex algorithm
-        # where we'll rely on librosa's implementation.
-        self.y_harmonic, self.y_percussive = librosa.effects.hpss(self.y_np)
-
-        # Mel-spectrogram using torchaudio transforms
-        melspec_transform = torchaudio.transforms.MelSpectrogram(
-            sample_rate=self.sr,
-            n_fft=self.n_fft,
-            hop_length=self.hop_length,
-            n_mels=self.n_mels
-        )
-        self.melspec = melspec_transform(self.waveform).squeeze(0) # Squeeze batch dim
-
-        # Get energy for bass, mids, and treble bands over time
-        self.bass_energy = self._get_spectral_band_energy(self.melspec, (20, 250))
-        self.mid_energy = self._get_spectral_band_energy(self.melspec, (250, 4000))
-        self.treble_energy = self._get_spectral_band_energy(self.melspec, (4000, 20000))
+        # where we'll rely on librosa's implementation. It decomposes the complex STFT
+        # computed above, so only the two inverse transforms remain.
+        D_harmonic, D_percussive = librosa.decompose.hpss(stft.squeeze(0).cpu().numpy())
+        del stft
+        self.y_harmonic = librosa.istft(D_harmonic, hop_length=self.hop_length, length=len(self.y_np))
+        self.y_percussive = librosa.istft(D_percussive, hop_length=self.hop_length, length=len(self.y_np))
+
+        # Get energy for bass, mids, and treble bands over time.
+        # Map the band edges (Hz) to mel rows once, then sum all three bands in one pass.
+        e0, e1, e2, e3 = mel_band_edges(self.n_mels, self.sr)
+        band_sums = np.add.reduceat(self.melspec.numpy()[:e3], [e0, e1, e2], axis=0)
+        self.bass_energy, self.mid_energy, self.treble_energy = band_sums
 
         # --- 4. Structural Features ---
-        # MFCCs using torchaudio
-        mfcc_transform = torchaudio.transforms.MFCC(
-            sample_rate=self.sr,
-            n_mfcc=13,
-            melkwargs={'n_fft': self.n_fft, 'hop_length': self.hop_length, 'n_mels': self.n_mels}
-        )
-        mfccs = mfcc_transform(self.waveform).squeeze(0).numpy()
+        # MFCCs come from the same compiled chain as the mel-spectrogram above
+        mfccs = mfccs.squeeze(0).cpu().numpy()
 
         # Chroma features are often better with CQT, so we use librosa here.
-        chroma = librosa.feature.chroma_cqt(y=self.y_np, sr=self.sr, hop_length=self.hop_length)
+        chroma = librosa.feature.chroma_cqt(y=self.y_np, sr=self.sr, hop_length=self.hop_length).astype(np.float32, copy=False)
         
         # Combine features for segmentation
         # Ensure they have the same number of frames
         min_frames = min(mfccs.shape[1], chroma.shape[1])
-        stacked_features = np.vstack([mfccs[:, :min_frames], chroma[:, :min_frames]])
+        stacked_features = np.vstack([mfccs[:, :min_frames], chroma[:, :min_frames]]).astype(np.float32, copy=False)
 
-        # Build a recurrence matrix using scipy (replaces librosa.segment.recurrence_matrix)
-        # We compute pairwise distances and convert to an affinity matrix.
-        R_dist = pdist(stacked_features.T, metric='euclidean')
-        R_sq = squareform(R_dist)
-        R_affinity = 1 - (R_sq / np.max(R_sq))
+        # Build a sparse k-NN recurrence graph (replaces librosa.segment.recurrence_matrix).
+        # Only each frame's nearest neighbours are stored, instead of a dense N x N matrix.
+        n_neighbors = min(32, stacked_features.shape[1] - 1)
+        knn = kneighbors_graph(stacked_features.T, n_neighbors=n_neighbors, mode='distance', include_self=False)
+        knn = 0.5 * (knn + knn.T)
         
         # Use clustering to find segment boundaries
         n_segments = 8 # You can tune this number
-        clusterer = AgglomerativeClustering(n_clusters=n_segments, linkage='ward')
-        segment_labels = clusterer.fit_predict(1 - R_affinity)
+        # Ward runs on the frame features themselves, restricted to merges along the k-NN graph
+        clusterer = AgglomerativeClustering(n_clusters=n_segments, linkage='ward', connectivity=knn)
+        segment_labels = clusterer.fit_predict(stacked_features.T)
         
         # Find the points where the label changes
-        boundaries = np.where(np.diff(segment_labels))[0]
+        boundaries = np.flatnonzero(np.not_equal(segment_labels[1:], segment_labels[:-1]))
         self.segment_boundaries = librosa.frames_to_time(boundaries, sr=self.sr, hop_length=self.hop_length)
         self.segment_labels = segment_labels
 
@@ -130,19 +216,47 @@ class SongTorchaudio:
             np.std(self.treble_energy)
         ])
 
-    def _get_spectral_band_energy(self, melspec_tensor, freq_range_hz):
-        """Helper to calculate energy in a specific frequency band from a torchaudio melspec."""
-        # Use librosa's utility to get mel frequency centers
-        mel_freqs = librosa.mel_frequencies(n_mels=self.n_mels, fmin=0, fmax=self.sr/2)
-        
-        # Find the mel bands corresponding to the frequency range
-        start_band = np.argmin(np.abs(mel_freqs - freq_range_hz[0]))
-        end_band = np.argmin(np.abs(mel_freqs - freq_range_hz[1]))
-        
-        # Sum the energy in those bands for each time frame
-        # Convert tensor to numpy for this operation
-        band_energy = np.sum(melspec_tensor.numpy()[start_band:end_band+1, :], axis=0)
-        return band_energy
+    @classmethod
+    def batch_extract(cls, paths, sr=11025, n_fft=2048, hop_length=512, n_mels=128, device=None):
+        """
+        Computes mel-spectrograms and MFCCs for many songs in a single batched forward pass.
+
+        All waveforms are zero-padded to the longest one and stacked into an (N, T_max)
+        tensor, so the STFT and mel projection run once for the whole batch. The padded
+        batch and its (N, n_mels, frames) outputs must fit on the device at once: VRAM
+        grows with N times the longest song, so split very long lists into smaller calls.
+
+        Args:
+            paths (list): The paths to the audio files.
+            sr (int): The sample rate to resample to before analysis.
+            n_fft (int): The number of samples in an FFT window.
+            hop_length (int): The number of samples between successive frames.
+            n_mels (int): The number of mel bands to generate.
+            device (str): Torch device for the transforms. Defaults to 'cuda' when available.
+
+        Returns:
+            list: One dict per path with CPU tensors 'melspec', 'melspec_db' and 'mfcc',
+                cropped to that song's own length.
+        """
+        device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
+
+        waveforms = [_load_waveform(path, sr).squeeze(0) for path in paths]
+        lengths = [w.shape[0] for w in waveforms]
+        batch = torch.nn.utils.rnn.pad_sequence(waveforms, batch_first=True).to(device)
+
+        mel_features = _get_transforms(sr, n_fft, hop_length, n_mels, device)
+        melspec, melspec_db, mfccs = mel_features(mel_features.stft(batch).abs().pow_(2))
+
+        results = []
+        for i, length in enumerate(lengths):
+            # Drop the frames that only cover padding (center=True gives length // hop + 1 frames)
+            n_frames = length // hop_length + 1
+            results.append({
+                'melspec': melspec[i, :, :n_frames].cpu(),
+                'melspec_db': melspec_db[i, :, :n_frames].cpu(),
+                'mfcc': mfccs[i, :, :n_frames].cpu(),
+            })
+        return results
 
     def summarize(self):
         """Prints a summary of the extracted features."""
@@ -162,12 +276,25 @@ class SongTorchaudio:
         """
         Creates and displays a comprehensive plot using Matplotlib.
         """
-        fig, ax = plt.subplots(nrows=4, ncols=1, sharex=True, figsize=(15, 20))
+        # Nothing to show or save: skip the matplotlib work entirely
+        if not show and plot_path is None:
+            return
+
+        # Cap the number of waveform samples handed to matplotlib
+        step = max(1, len(self.y_np) // 100000)
+
+        if show:
+            fig, ax = plt.subplots(nrows=4, ncols=1, sharex=True, figsize=(15, 20))
+        else:
+            # Saving only: draw on a standalone Agg figure, leaving pyplot's backend and open figures alone
+            fig = Figure(figsize=(15, 20))
+            FigureCanvasAgg(fig)
+            ax = fig.subplots(nrows=4, ncols=1, sharex=True)
         fig.suptitle('Song Feature Analysis (Torchaudio Backend)', fontsize=16)
 
         # --- Plot 1: Waveform with Beats and Onsets ---
-        time_axis = np.linspace(0, self.duration, num=self.waveform.shape[1])
-        ax[0].plot(time_axis, self.y_np, alpha=0.6, label='Waveform')
+        time_axis = np.linspace(0, self.duration, num=self.waveform.shape[1])[::step]
+        ax[0].plot(time_axis, self.y_np[::step], alpha=0.6, label='Waveform')
         ax[0].vlines(self.beats, -1, 1, color='r', linestyle='--', label='Beats')
         ax[0].vlines(self.onsets, -1, 1, color='g', linestyle=':', label='Onsets')
         ax[0].set_title('Waveform, Beats, and Onsets')
@@ -187,20 +314,16 @@ class SongTorchaudio:
         ax[1].grid(True)
 
         # --- Plot 3: Harmonic vs. Percussive Components ---
-        ax[2].plot(time_axis, self.y_harmonic, alpha=0.6, label='Harmonic')
-        ax[2].plot(time_axis, self.y_percussive, alpha=0.6, color='r', label='Percussive')
+        ax[2].plot(time_axis, self.y_harmonic[::step], alpha=0.6, label='Harmonic')
+        ax[2].plot(time_axis, self.y_percussive[::step], alpha=0.6, color='r', label='Percussive')
         ax[2].set_title('Harmonic vs. Percussive Components')
         ax[2].set_ylabel('Amplitude')
         ax[2].legend()
         ax[2].grid(True)
 
         # --- Plot 4: Mel Spectrogram with Structural Segments ---
-        # Convert power spectrogram to decibels for visualization
-        db_transform = torchaudio.transforms.AmplitudeToDB(stype='power', top_db=80)
-        melspec_db = db_transform(self.melspec)
-        
         # Use matplotlib's pcolormesh for the spectrogram
-        img = ax[3].pcolormesh(times, librosa.mel_frequencies(n_mels=self.n_mels), melspec_db.numpy(), 
+        img = ax[3].pcolormesh(times, librosa.mel_frequencies(n_mels=self.n_mels), self.melspec_db.numpy(), 
                                shading='gouraud', cmap='magma')
         fig.colorbar(img, ax=ax[3], format='%+2.0f dB')
         
@@ -209,14 +332,14 @@ class SongTorchaudio:
         ax[3].set_ylabel('Frequency (Hz)')
         ax[3].legend(loc='upper right')
 
-        plt.xlabel('Time (s)')
-        plt.tight_layout(rect=[0, 0.03, 1, 0.95])
+        ax[3].set_xlabel('Time (s)')
+        fig.tight_layout(rect=[0, 0.03, 1, 0.95])
         
-        if plot_path: plt.savefig(plot_path / f"{Path(self.file_path).stem}_ta.png")
-            
-        if show: plt.show()
+        if plot_path: fig.savefig(plot_path / f"{Path(self.file_path).stem}_ta.png")
             
-        plt.close()
+        if show:
+            plt.show()
+            plt.close(fig)
 
 
 # --- Example Usage ---
@@ -1,9 +1,10 @@
 import os
 from soundcloud import Client
 from dotenv import load_dotenv
-from urllib.parse import urlparse
+from urllib.parse import urlparse, parse_qs
 import webbrowser
 import json
+import time
 
 def get_oauth_token():
     """
@@ -42,9 +43,8 @@ def get_oauth_token():
 
     # 3. Extract the authorization code from the redirected URL
     parsed_url = urlparse(redirected_url)
-    try:
-        code = [q.split("=")[1] for q in parsed_url.query.split("&") if q.startswith("code=")][0]
-    except IndexError:
+    code = parse_qs(parsed_url.query).get('code', [None])[0]
+    if not code:
         print("\nError: Could not find 'code' in the redirected URL.")
         print("Please make sure you copied the correct URL.")
         return
@@ -54,11 +54,13 @@ def get_oauth_token():
         token_response = client.exchange_token(code)
         access_token = token_response.access_token
         refresh_token = token_response.refresh_token
+        expires_in = getattr(token_response, 'expires_in', None) or 3600
         
-        # Save the tokens to a file for later use
+        # Save the tokens to a file for later use, with the expiry so the client can refresh proactively
         credentials = {
             'access_token': access_token,
-            'refresh_token': refresh_token
+            'refresh_token': refresh_token,
+            'expires_at': time.time() + expires_in
         }
         creds_path = os.path.join(os.path.dirname(__file__), 'credentials.json')
         with open(creds_path, 'w') as f:
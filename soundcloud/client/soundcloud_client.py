@@ -1,15 +1,100 @@
 from dotenv import load_dotenv
 import os
 import time
+import functools
+import requests
+import soundcloud.request
+import soundcloud.resource
+from requests.adapters import HTTPAdapter
 from soundcloud import Client
 from urllib.parse import urlparse
+from urllib3.util.retry import Retry
 import json
 
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib json module
+    orjson = None
+
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
 load_dotenv(dotenv_path=dotenv_path)
+creds_path = os.path.join(os.path.dirname(__file__), 'credentials.json')
+TOKEN_URL = 'https://api.soundcloud.com/oauth2/token'
+# Refresh the access token if it expires within this many seconds
+TOKEN_EXPIRY_MARGIN = 60
+
+
+@functools.lru_cache(maxsize=1)
+def _load_credentials(path):
+    """Reads and parses credentials.json once per process."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class _PooledRequests:
+    """
+    Stands in for the `requests` module inside soundcloud.request, which calls
+    requests.get/post/... directly (a fresh connection per call). HTTP verbs are
+    routed through a pooled keep-alive Session; everything else (exceptions,
+    status codes) still comes from `requests`.
+    """
+    _VERBS = ('get', 'post', 'put', 'delete', 'head', 'patch', 'options')
+
+    def __init__(self, session):
+        self._session = session
+
+    def __getattr__(self, name):
+        if name in self._VERBS:
+            return getattr(self._session, name)
+        return getattr(requests, name)
+
+
+def _build_session():
+    """Builds the pooled keep-alive Session shared by every SoundCloud request in the process."""
+    session = requests.Session()
+    session.headers['Connection'] = 'keep-alive'
+    session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20,
+                                          max_retries=Retry(total=3, backoff_factor=0.2)))
+    return session
+
+
+# Reuse TCP/TLS connections across API calls instead of reconnecting for each one.
+# Patched once at import (and left alone on re-import), not per client instance.
+if isinstance(soundcloud.request.requests, _PooledRequests):
+    _session = soundcloud.request.requests._session
+else:
+    _session = _build_session()
+    soundcloud.request.requests = _PooledRequests(_session)
+
+
+class _OrjsonModule:
+    """
+    Stands in for the `json` module inside soundcloud.resource, which decodes every
+    API response with json.loads. Decoding goes through orjson instead; everything
+    else still comes from `json`.
+    """
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+    def __getattr__(self, name):
+        return getattr(json, name)
+
+
+# Patched once at import; skipped if orjson is missing or the patch is already installed
+if orjson is not None and not isinstance(soundcloud.resource.json, _OrjsonModule):
+    soundcloud.resource.json = _OrjsonModule()
 
 
 class SoundCloudClient(Client):
+    # App credentials, read once from the environment (.env is loaded at import)
+    CLIENT_ID = os.getenv('CLIENT_ID')
+    CLIENT_SECRET = os.getenv('CLIENT_SECRET')
+    REDIRECT_URI = os.getenv('REDIRECT_URI')
+
     def __init__(self):
         """
         Initializes the SoundCloudClient.
@@ -17,33 +102,68 @@ class SoundCloudClient(Client):
         using credentials from a .env file and an access token from
         credentials.json.
         """
-        self.client_id = os.getenv('CLIENT_ID')
-        self.client_secret = os.getenv('CLIENT_SECRET')
-        self.redirect_uri = os.getenv('REDIRECT_URI')
-        self.creds_path = os.path.join(os.path.dirname(__file__), 'credentials.json')
+        self.client_id = self.CLIENT_ID
+        self.client_secret = self.CLIENT_SECRET
+        self.redirect_uri = self.REDIRECT_URI
+        self.creds_path = creds_path
 
         if not all([self.client_id, self.client_secret, self.redirect_uri]):
             raise ValueError("CLIENT_ID, CLIENT_SECRET, or REDIRECT_URI not set in .env file")
 
+        self._session = _session
+
         access_token = self._get_access_token()
         super().__init__(client_id=self.client_id, client_secret=self.client_secret, access_token=access_token)
 
     def _get_access_token(self):
         """
-        Retrieves the access token from credentials.json.
+        Retrieves the access token from credentials.json, refreshing it first
+        if it has expired or is about to (saves a failed 401 round trip).
         If the file doesn't exist, it prompts the user to run the oauth script.
         """
         if not os.path.exists(self.creds_path):
             print("Credentials not found. Please run 'python soundbits/soundcloud/init_oauth.py' to authenticate.")
             return None
             
-        with open(self.creds_path, 'r') as f:
-            creds = json.load(f)
-        
-        # Here you could add logic to check if the token is expired and refresh it
-        # using the 'refresh_token', but for now, we'll just use the access token.
+        creds = _load_credentials(self.creds_path)
+
+        # Credentials saved before expiry tracking have no 'expires_at' and are refreshed once
+        if creds.get('refresh_token') and creds.get('expires_at', 0) - time.time() < TOKEN_EXPIRY_MARGIN:
+            try:
+                creds = self._refresh(creds['refresh_token'])
+            except requests.RequestException as e:
+                print(f"Could not refresh the access token: {e}")
         return creds.get('access_token')
 
+    def _refresh(self, refresh_token):
+        """
+        Exchanges the refresh token for a new access token and saves it to credentials.json.
+
+        Returns:
+            dict: The updated credentials.
+        """
+        response = self._session.post(TOKEN_URL, data={
+            'grant_type': 'refresh_token',
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+            'refresh_token': refresh_token,
+        })
+        response.raise_for_status()
+        token = response.json()
+
+        creds = {
+            'access_token': token['access_token'],
+            'refresh_token': token.get('refresh_token', refresh_token),
+            'expires_at': time.time() + token.get('expires_in', 3600),
+        }
+        # Write to a temp file and swap it in, so an interrupted save never corrupts the credentials
+        tmp_path = self.creds_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(creds, f)
+        os.replace(tmp_path, self.creds_path)
+        _load_credentials.cache_clear()
+        return creds
+
     def get_user_tracks_by_permalink(self, permalink):
         """
         A new method to fetch all tracks for a user given their permalink.
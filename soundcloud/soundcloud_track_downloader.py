@@ -1,8 +1,12 @@
-from sclib import SoundcloudAPI, Track, Playlist
+from sclib.asyncio import SoundcloudAPI, Track, Playlist
+import asyncio
 import tqdm
 from pathlib import Path
-import pandas as pd
-import re
+from contextlib import nullcontext
+import pyarrow as pa
+import pyarrow.feather as feather
+import csv
+import operator
 
 # Create base downloads directory and subdirectories
 downloads_dir = Path('/home/brett/Desktop/pers/soundbits/soundcloud/downloads')
@@ -11,69 +15,150 @@ mixes_dir = downloads_dir / 'mixes'
 songs_dir.mkdir(parents=True, exist_ok=True)
 mixes_dir.mkdir(parents=True, exist_ok=True)
 
-# CSV file paths
+# Metadata file paths
 all_tracks_csv = downloads_dir / 'all_playlist_tracks.csv'
+all_tracks_feather = all_tracks_csv.with_suffix('.feather')
 mixes_csv = downloads_dir / 'downloaded_mixes.csv'
+# Format of the all-tracks metadata: 'feather' (fast columnar, read back with pyarrow/pandas)
+# or 'csv' (human-readable, streamed row by row as tracks finish)
+METADATA_FORMAT = 'feather'
+# CSV columns: every Track slot, then our download status
+_TRACK_SLOTS = tuple(Track.__slots__)
+_get_track_slots = operator.attrgetter(*_TRACK_SLOTS)
+csv_fieldnames = list(_TRACK_SLOTS) + ['downloaded', 'download_path']
+
+# Maximum number of tracks downloading at the same time
+MAX_CONCURRENT_DOWNLOADS = 8
+# Write buffer per download; large mixes would otherwise issue a syscall every 8 KiB
+DOWNLOAD_BUFFER_SIZE = 1 << 20
+
+# Characters that are invalid in Windows/macOS/Linux filenames, as a deletion table for str.translate
+_INVALID_FN_TABLE = str.maketrans('', '', '\\/*?:"<>|')
 
 # do not pass a Soundcloud client ID that did not come from this library, but you can save a client_id that this lib found and reuse it
-api = SoundcloudAPI()  
+api = SoundcloudAPI()
 
 def sanitize_filename(filename):
     """Removes characters that are invalid in Windows/macOS/Linux filenames."""
-    return re.sub(r'[\\/*?:"<>|]', "", filename)
-
-try: 
-    playlist = api.resolve('https://soundcloud.com/brett-hockey/sets/jams')
-    assert isinstance(playlist, Playlist)
+    return filename.translate(_INVALID_FN_TABLE)
+
+def write_csv(path, rows):
+    """Writes a list of track_info dicts straight to a CSV file."""
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=csv_fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def write_feather(path, rows):
+    """Writes a list of track_info dicts to an lz4-compressed Feather file."""
+    # Nested/object slots (e.g. the API client, user dicts) are stored as their string form, as in the CSV
+    rows = [
+        {key: value if value is None or isinstance(value, (str, int, float)) else str(value) for key, value in row.items()}
+        for row in rows
+    ]
+    table = pa.Table.from_pylist(rows)
+    feather.write_feather(table, str(path), compression='lz4')
+
+async def download_one(sem, track: Track, pbar):
+    """
+    Collects a track's metadata and, if it is downloadable, downloads it.
+    At most MAX_CONCURRENT_DOWNLOADS of these transfer at once (bounded by sem).
+
+    Returns:
+        tuple: (track_info, downloaded_mix) where downloaded_mix is True if a mix was downloaded in this run.
+    """
+    clean_title = sanitize_filename(f'{track.artist} - {track.title}')
+
+    try:
+        track_info = dict(zip(_TRACK_SLOTS, _get_track_slots(track)))
+    except AttributeError:
+        # Some slot was never set on this track; fall back to filling the gaps with None
+        track_info = {slot: getattr(track, slot, None) for slot in _TRACK_SLOTS}
+    track_info['downloaded'] = False
+    track_info['download_path'] = ''
+    downloaded_mix = False
+
+    if track.downloadable:
+        try:
+            is_mix = (track.duration / 1000) > 900  # duration is in ms
+            download_dir = mixes_dir if is_mix else songs_dir
+            path = download_dir / f'{clean_title}.mp3'
+
+            # Skip files finished by a previous run; partial downloads only ever exist as .part files
+            if path.exists() and path.stat().st_size > 0:
+                track_info['downloaded'] = True
+                track_info['download_path'] = str(path)
+                pbar.update(1)
+                return track_info, downloaded_mix
+
+            part_path = path.with_name(path.name + '.part')
+            async with sem:
+                pbar.set_description(f"Downloading: {clean_title[:35]}")
+                # A regular binary file: write_mp3_to writes, seeks and tags it synchronously (mutagen)
+                with open(part_path, 'wb+', buffering=DOWNLOAD_BUFFER_SIZE) as file:
+                    await track.write_mp3_to(file)
+            part_path.replace(path)
+
+            track_info['downloaded'] = True
+            track_info['download_path'] = str(path)
+            downloaded_mix = is_mix
+
+        except Exception as e:
+            print(f"\nFailed to download {clean_title}: {e}")
+
+    pbar.update(1)
+    return track_info, downloaded_mix
+
+async def main():
+    playlist: Playlist = await api.resolve('https://soundcloud.com/brett-hockey/sets/jams')
 
     all_tracks_data = []
     downloaded_mixes_data = []
+    stream_csv = METADATA_FORMAT == 'csv'
 
     print(f"Processing playlist: {playlist.title} ({len(playlist.tracks)} tracks)")
 
-    with tqdm.tqdm(playlist.tracks, unit="track") as pbar:
-        for track in pbar:
-            assert isinstance(track, Track)
-
-            clean_title = sanitize_filename(f'{track.artist} - {track.title}')
-            pbar.set_description(f"Checking: {clean_title[:40]}")
-
-            track_info = {slot: getattr(track, slot, None) for slot in track.__slots__}
-            track_info['downloaded'] = False
-            track_info['download_path'] = ''
-
-            if track.downloadable:
-                try:
-                    is_mix = (track.duration / 1000) > 900  # duration is in ms
-                    download_dir = mixes_dir if is_mix else songs_dir
-                    path = download_dir / f'{clean_title}.mp3'
-                    
-                    pbar.set_description(f"Downloading: {clean_title[:35]}")
-                    with open(path, 'wb+') as file:
-                        track.write_mp3_to(file)
-
-                    track_info['downloaded'] = True
-                    track_info['download_path'] = str(path)
-                    
-                    if is_mix:
-                        downloaded_mixes_data.append(track_info)
-
-                except Exception as e:
-                    print(f"\nFailed to download {clean_title}: {e}")
-            
-            all_tracks_data.append(track_info)
-
-    if all_tracks_data:
-        pd.DataFrame(all_tracks_data).to_csv(all_tracks_csv, index=False)
-        print(f"\nSuccess: All track metadata saved to '{all_tracks_csv.name}'")
+    # In CSV mode, stream each track's metadata row to disk as soon as it is processed, so memory
+    # stays constant and progress survives a crash. Feather is columnar, so rows are collected
+    # and written in one go at the end.
+    with open(all_tracks_csv, 'w', newline='') if stream_csv else nullcontext() as all_tracks_file:
+        if stream_csv:
+            all_tracks_writer = csv.DictWriter(all_tracks_file, fieldnames=csv_fieldnames)
+            all_tracks_writer.writeheader()
+
+        async def process_track(sem, track, pbar):
+            track_info, downloaded_mix = await download_one(sem, track, pbar)
+            if stream_csv:
+                all_tracks_writer.writerow(track_info)
+                all_tracks_file.flush()
+            else:
+                all_tracks_data.append(track_info)
+            if downloaded_mix:
+                downloaded_mixes_data.append(track_info)
+
+        # Download all tracks concurrently; the semaphore keeps at most
+        # MAX_CONCURRENT_DOWNLOADS transfers in flight.
+        sem = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+        with tqdm.tqdm(total=len(playlist.tracks), unit="track") as pbar:
+            async with asyncio.TaskGroup() as tg:
+                for track in playlist.tracks:
+                    tg.create_task(process_track(sem, track, pbar))
+
+    if not stream_csv:
+        write_feather(all_tracks_feather, all_tracks_data)
+    all_tracks_path = all_tracks_csv if stream_csv else all_tracks_feather
+    print(f"\nSuccess: All track metadata saved to '{all_tracks_path.name}'")
 
     if downloaded_mixes_data:
-        pd.DataFrame(downloaded_mixes_data).to_csv(mixes_csv, index=False)
+        write_csv(mixes_csv, downloaded_mixes_data)
         print(f"Success: Downloaded mixes metadata saved to '{mixes_csv.name}'")
     else:
         print("No new mixes were downloaded in this run.")
 
-except Exception as e:
-    print(f"An error occurred: {e}")
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        print(f"An error occurred: {e}")
 
-print("Done")
\ No newline at end of file
+    print("Done")
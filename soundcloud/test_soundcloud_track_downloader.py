@@ -0,0 +1,46 @@
+import asyncio
+import types
+from unittest import mock
+
+import soundcloud_track_downloader as downloader
+
+MP3_BYTES = b'ID3' + bytes(range(256)) * 64
+
+class FakeTrack(types.SimpleNamespace):
+    async def write_mp3_to(self, fp):
+        # Mirrors sclib: writes the audio, then rewinds and reads it back to tag it
+        fp.write(MP3_BYTES)
+        fp.seek(0)
+        assert fp.read(3) == b'ID3'
+
+def run_download(track):
+    pbar = mock.Mock()
+    return asyncio.run(downloader.download_one(asyncio.Semaphore(1), track, pbar))
+
+def test_download_one_writes_bytes(tmp_path):
+    """
+    Downloads a fake track and checks the bytes land in the final file, with no .part left behind.
+    """
+    track = FakeTrack(artist='Artist', title='Title: Demo', downloadable=True, duration=180_000)
+    with mock.patch.object(downloader, 'songs_dir', tmp_path), mock.patch.object(downloader, 'mixes_dir', tmp_path):
+        track_info, downloaded_mix = run_download(track)
+
+    path = tmp_path / 'Artist - Title Demo.mp3'
+    assert track_info['downloaded'] and track_info['download_path'] == str(path)
+    assert not downloaded_mix
+    assert path.read_bytes() == MP3_BYTES
+    assert not list(tmp_path.glob('*.part'))
+
+def test_download_one_skips_finished_file(tmp_path):
+    """
+    A file finished by a previous run is kept as-is instead of being downloaded again.
+    """
+    (tmp_path / 'Artist - Title.mp3').write_bytes(b'done')
+    track = FakeTrack(artist='Artist', title='Title', downloadable=True, duration=180_000)
+    track.write_mp3_to = mock.AsyncMock()
+    with mock.patch.object(downloader, 'songs_dir', tmp_path), mock.patch.object(downloader, 'mixes_dir', tmp_path):
+        track_info, _ = run_download(track)
+
+    assert track_info['downloaded']
+    track.write_mp3_to.assert_not_called()
+    assert (tmp_path / 'Artist - Title.mp3').read_bytes() == b'done'
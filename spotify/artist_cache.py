@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+
+from metadata_cache import default_cache
+
+# Artist genres live in the 'artists' table of the shared metadata cache
+TABLE = 'artists'
+
+def get_genres(ids, cache=None):
+    """
+    Looks up cached genres for the given artist IDs.
+
+    Returns:
+        tuple: (dict of artist ID -> genres for fresh cache hits, list of IDs that still need fetching)
+    """
+    ids = list(ids)
+    cached = (cache or default_cache()).get_many(TABLE, ids)
+    missing = [artist_id for artist_id in ids if artist_id not in cached]
+    return cached, missing
+
+def put_genres(artist_genres, cache=None):
+    """Stores freshly fetched genres (a dict of artist ID -> genres) in the cache."""
+    (cache or default_cache()).put_many(TABLE, artist_genres)
+
+
+class LRUGenreCache:
+    """
+    In-process LRU layer over the on-disk cache, so repeated lookups within a run skip SQLite.
+    Has the same get_genres/put_genres interface as this module.
+    """
+    def __init__(self, maxsize=4096, cache=None):
+        self.maxsize = maxsize
+        self.cache = cache
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_genres(self, ids):
+        cached, missing_ids = {}, []
+        with self._lock:
+            for artist_id in ids:
+                if artist_id in self._entries:
+                    self._entries.move_to_end(artist_id)
+                    cached[artist_id] = self._entries[artist_id]
+                else:
+                    missing_ids.append(artist_id)
+
+        if missing_ids:
+            from_disk, missing_ids = get_genres(missing_ids, self.cache)
+            self._remember(from_disk)
+            cached.update(from_disk)
+        return cached, missing_ids
+
+    def put_genres(self, artist_genres):
+        put_genres(artist_genres, self.cache)
+        self._remember(artist_genres)
+
+    def _remember(self, artist_genres):
+        with self._lock:
+            for artist_id, genres in artist_genres.items():
+                self._entries[artist_id] = genres
+                self._entries.move_to_end(artist_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
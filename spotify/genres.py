@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+import artist_cache
+
+# The /v1/artists endpoint accepts at most 50 IDs per request
+ARTISTS_PER_REQUEST = 50
+
+def fetch_artist_genres(client, artist_ids, max_workers=8, *, cache=artist_cache, executor=None):
+    """
+    Batch fetches the genres of the given artists.
+    Artists already in the cache are served from it; only the rest hit the API,
+    in chunks of 50 (the API limit), several chunks at a time.
+    Rate limiting (429 + Retry-After) is handled by the client's session.
+
+    Args:
+        cache: Anything with get_genres/put_genres like the artist_cache module, or None to always fetch.
+        executor: An existing thread pool to fan requests out on, instead of a new one per call.
+
+    Returns:
+        dict: A mapping of artist ID to its list of genres.
+    """
+    artist_ids = set(artist_ids)
+    if cache is not None:
+        artist_genres, missing_ids = cache.get_genres(artist_ids)
+    else:
+        artist_genres, missing_ids = {}, list(artist_ids)
+    chunks = [missing_ids[i:i+ARTISTS_PER_REQUEST] for i in range(0, len(missing_ids), ARTISTS_PER_REQUEST)]
+
+    def fetch_chunk(chunk):
+        return client.sp_public.artists(chunk)['artists']
+
+    fetched_genres = {}
+    with nullcontext(executor) if executor else ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for artists_details in pool.map(fetch_chunk, chunks):
+            for artist in artists_details:
+                if artist:
+                    fetched_genres[artist['id']] = artist.get('genres', [])
+
+    if cache is not None:
+        cache.put_genres(fetched_genres)
+    artist_genres.update(fetched_genres)
+    return artist_genres
@@ -0,0 +1,109 @@
+import functools
+import json
+import re
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from urllib.parse import urlparse
+
+CACHE_PATH = Path.home() / '.cache' / 'soundbits' / 'spotify.sqlite'
+# Used when the API response carried no Cache-Control max-age; tracks and artists barely change
+TTL_SECONDS = 30 * 24 * 60 * 60
+TABLES = ('tracks', 'artists')
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+class MetadataCache:
+    """
+    On-disk cache of Spotify API objects keyed by ID, so warm runs skip the API.
+    Each call opens its own connection, so one cache can be shared across threads.
+    """
+    def __init__(self, path=CACHE_PATH, ttl=TTL_SECONDS):
+        self.path = Path(path)
+        self.ttl = ttl
+        # Latest Cache-Control max-age seen per table, recorded by observe_response
+        self._max_age = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn, conn:
+            for table in TABLES:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY, payload BLOB, expires_at INTEGER)")
+
+    def _connect(self):
+        # closing() closes the connection; callers nest `with conn` to commit
+        return closing(sqlite3.connect(self.path))
+
+    def observe_response(self, response, *args, **kwargs):
+        """
+        requests response hook: remembers the Cache-Control max-age of /v1/tracks and /v1/artists
+        responses, so objects stored afterwards expire when the API says they go stale.
+        """
+        path = urlparse(response.url).path
+        for table in TABLES:
+            if path.startswith(f'/v1/{table}') and response.status_code == 200:
+                match = _MAX_AGE.search(response.headers.get('Cache-Control', ''))
+                if match:
+                    self._max_age[table] = int(match.group(1))
+
+    def get_many(self, table, ids):
+        """
+        Returns a dict of ID -> cached object for the given IDs that are cached and not expired.
+        """
+        ids = list(ids)
+        found = {}
+        with self._connect() as conn, conn:
+            # Query in batches to stay under SQLite's bound-parameter limit
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i+500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(
+                    f"SELECT id, payload FROM {table} WHERE expires_at > ? AND id IN ({placeholders})",
+                    [int(time.time()), *chunk]
+                )
+                found.update((object_id, json.loads(payload)) for object_id, payload in rows)
+        return found
+
+    def put_many(self, table, objects):
+        """
+        Stores a dict of ID -> object; None values (unknown IDs) are not cached.
+        """
+        expires_at = int(time.time()) + self._max_age.get(table, self.ttl)
+        with self._connect() as conn, conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {table} (id, payload, expires_at) VALUES (?, ?, ?)",
+                [(object_id, json.dumps(obj), expires_at) for object_id, obj in objects.items() if obj is not None]
+            )
+
+    def get_or_fetch(self, table, object_id, fetcher):
+        """
+        Returns the cached object for object_id, calling fetcher(object_id) and caching the result on a miss.
+        """
+        return self.get_many_or_fetch(table, [object_id], lambda ids: [fetcher(ids[0])])[object_id]
+
+    def get_many_or_fetch(self, table, ids, fetch_many, batch_size=50):
+        """
+        Returns a dict of ID -> object for all given IDs. Misses are fetched in batches with
+        fetch_many(list_of_ids), which must return the objects in the same order (None if unknown).
+        """
+        ids = list(dict.fromkeys(ids))
+        found = self.get_many(table, ids)
+        missing_ids = [object_id for object_id in ids if object_id not in found]
+        fetched = {}
+        for i in range(0, len(missing_ids), batch_size):
+            chunk = missing_ids[i:i+batch_size]
+            fetched.update(zip(chunk, fetch_many(chunk)))
+        self.put_many(table, fetched)
+        found.update(fetched)
+        return found
+
+    def clear(self):
+        """
+        Removes every cached object.
+        """
+        with self._connect() as conn, conn:
+            for table in TABLES:
+                conn.execute(f"DELETE FROM {table}")
+
+@functools.lru_cache(maxsize=1)
+def default_cache():
+    """Returns the process-wide cache backed by CACHE_PATH, created on first use."""
+    return MetadataCache()
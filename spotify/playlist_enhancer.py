@@ -1,36 +1,26 @@
 import os
 import time
 from spotify_client import SpotifyAPI
+from genres import fetch_artist_genres
 from dotenv import load_dotenv
-from collections import Counter
+from collections import Counter, defaultdict
+from itertools import chain
 
 def analyze_playlist_genres(client, playlist_tracks, top_n=3):
     """
     Analyzes the genre distribution of a list of tracks and returns the top 3.
     """
-    genre_counter = Counter()
-    artist_ids = set()
-    for item in playlist_tracks:
-        track = item.get('track')
-        if track and track.get('artists'):
-            artist_ids.add(track['artists'][0]['id'])
+    primary_artist_ids = [
+        item['track']['artists'][0]['id']
+        for item in playlist_tracks
+        if item.get('track') and item['track'].get('artists')
+    ]
 
     # Batch fetch artist details to get genres
-    artist_genres = {}
-    artist_id_list = list(artist_ids)
-    for i in range(0, len(artist_id_list), 50):
-        chunk = artist_id_list[i:i+50]
-        artists_details = client.sp_public.artists(chunk)['artists']
-        for artist in artists_details:
-            if artist:
-                artist_genres[artist['id']] = artist.get('genres', [])
-
-    # Count genres
-    for item in playlist_tracks:
-        track = item.get('track')
-        if track and track.get('artists'):
-            primary_artist_id = track['artists'][0]['id']
-            genre_counter.update(artist_genres.get(primary_artist_id, []))
+    artist_genres = fetch_artist_genres(client, set(primary_artist_ids))
+
+    # Count genres in a single Counter pass (one entry per track, as before)
+    genre_counter = Counter(chain.from_iterable(artist_genres.get(artist_id, []) for artist_id in primary_artist_ids))
 
     return [genre for genre, count in genre_counter.most_common(top_n)]
 
@@ -50,26 +40,20 @@ def main():
     print("Fetching liked songs and artist genres...")
     liked_songs = client.list_songs()
     liked_song_ids = {item['track']['id'] for item in liked_songs if item.get('track')}
-    
-    artist_ids_from_liked = {
-        item['track']['artists'][0]['id'] 
-        for item in liked_songs 
-        if item.get('track') and item['track'].get('artists')
-    }
-    
-    artist_genres_cache = {}
-    artist_id_list = list(artist_ids_from_liked)
-    for i in range(0, len(artist_id_list), 50):
-        chunk = artist_id_list[i:i+50]
-        artists_details = client.sp_public.artists(chunk)['artists']
-        for artist in artists_details:
-            if artist:
-                artist_genres_cache[artist['id']] = artist.get('genres', [])
-    print(f"Found {len(liked_song_ids)} liked songs and cached genres for {len(artist_genres_cache)} artists.")
 
-    # 2. Get user's playlists
-    playlists = client.sp_user.current_user_playlists()['items']
+    # Index liked tracks (id, uri) by primary artist so each playlist only visits matching artists
+    liked_by_artist = defaultdict(list)
+    for item in liked_songs:
+        track = item.get('track')
+        if track and track.get('artists'):
+            liked_by_artist[track['artists'][0]['id']].append((track['id'], track['uri']))
+
+    artist_genres_cache = fetch_artist_genres(client, liked_by_artist.keys())
+    print(f"Found {len(liked_song_ids)} liked songs and cached genres for {len(artist_genres_cache)} artists.")
 
+    # 2. Get user's playlists; listed up front because the playlists created below
+    # are inserted at the top and would shift the offsets of later pages
+    playlists = list(client.iter_playlists())
     for playlist in playlists:
         original_name = playlist['name']
         
@@ -96,22 +80,21 @@ def main():
         print(f"Top genres for this playlist: {top_genres}")
 
         # 6. Find matching liked songs to add
-        songs_to_add_uris = []
         original_song_ids = {item['track']['id'] for item in original_tracks if item.get('track')}
-        
-        for item in liked_songs:
-            track = item.get('track')
-            if not track or track['id'] in original_song_ids:
-                continue
+        top_genre_set = frozenset(top_genres)
 
-            # Use the cache for a fast, local genre lookup
-            primary_artist_id = track['artists'][0]['id'] if track.get('artists') else None
-            if primary_artist_id and any(genre in top_genres for genre in artist_genres_cache.get(primary_artist_id, [])):
-                songs_to_add_uris.append(track['uri'])
+        # Use the cache for a fast, local genre lookup: only artists sharing a top genre are visited
+        matching_artists = [artist_id for artist_id, genres in artist_genres_cache.items() if not top_genre_set.isdisjoint(genres)]
+        songs_to_add_uris = [
+            uri for artist_id in matching_artists
+            for track_id, uri in liked_by_artist[artist_id]
+            if track_id not in original_song_ids
+        ]
 
         # 7. Add new songs
         if songs_to_add_uris:
-            client.add_song_to_playlist(new_playlist['id'], songs_to_add_uris)
+            # Order of the added songs doesn't matter here, so upload the chunks concurrently
+            client.add_song_to_playlist(new_playlist['id'], songs_to_add_uris, concurrency=4)
             print(f"Added {len(songs_to_add_uris)} new songs from your liked tracks.")
         else:
             print("No new songs from liked tracks to add.")
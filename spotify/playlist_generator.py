@@ -1,37 +1,51 @@
 import os
 from spotify_client import SpotifyAPI
+from genres import fetch_artist_genres
 from dotenv import load_dotenv
 from collections import defaultdict
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 def get_all_user_tracks(client):
     """
     Fetches all unique tracks from a user's liked songs, playlists, and saved albums.
+
+    Returns:
+        defaultdict: A mapping of primary artist ID to that artist's tracks.
     """
     print("Fetching all your songs... (This might take a moment)")
     
     unique_track_ids = set()
-    all_tracks = []
+    tracks_by_artist = defaultdict(list)
 
-    def add_tracks(items):
-        for item in items:
-            track = item.get('track')
+    def iter_tracks(tracks):
+        for track in tracks:
             if track and track['id'] and track['id'] not in unique_track_ids:
                 unique_track_ids.add(track['id'])
-                all_tracks.append(track)
+                yield track
+
+    def add_tracks(tracks):
+        # Bucket tracks by primary artist as they stream in, rather than holding a flat list
+        for track in iter_tracks(tracks):
+            if track.get('artists'):
+                tracks_by_artist[track['artists'][0]['id']].append(track)
 
     # 1. Liked Songs
-    add_tracks(client.list_songs())
-    print(f"Found {len(all_tracks)} tracks in liked songs.")
-
-    # 2. Playlists
-    playlists = client.sp_user.current_user_playlists()
-    for playlist in playlists['items']:
-        print(f"Fetching songs from playlist: {playlist['name']}")
-        add_tracks(client.list_songs(playlist_id=playlist['id']))
+    add_tracks(item.get('track') for item in client.list_songs())
+    print(f"Found {len(unique_track_ids)} tracks in liked songs.")
+
+    # 2. Playlists (fetched concurrently over the client's pooled session). Each listing's later
+    # pages go through the client's own bounded page pool, so this only adds the first-page requests.
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = {executor.submit(client.list_songs, playlist_id=playlist['id']): playlist for playlist in client.iter_playlists()}
+        for future in as_completed(futures):
+            print(f"Fetched songs from playlist: {futures[future]['name']}")
+            add_tracks(item.get('track') for item in future.result())
     
-    print(f"Found {len(all_tracks)} unique tracks after scanning playlists.")
+    print(f"Found {len(unique_track_ids)} unique tracks after scanning playlists.")
 
     # 3. Saved Albums
+    next_page = client.sp_user.next
     albums = client.sp_user.current_user_saved_albums()
     while albums:
         for item in albums['items']:
@@ -42,19 +56,12 @@ def get_all_user_tracks(client):
                 # so we need to fetch them. To optimize, we fetch all at once.
                 track_ids = [t['id'] for t in album_tracks if t]
                 if track_ids:
-                    full_track_details = client.sp_public.tracks(track_ids)['tracks']
-                    for track in full_track_details:
-                         if track and track['id'] and track['id'] not in unique_track_ids:
-                            unique_track_ids.add(track['id'])
-                            all_tracks.append(track)
+                    add_tracks(client.sp_public.tracks(track_ids)['tracks'])
         
-        if albums['next']:
-            albums = client.sp_user.next(albums)
-        else:
-            albums = None
+        albums = next_page(albums) if albums['next'] else None
 
-    print(f"Found {len(all_tracks)} unique tracks in total.")
-    return all_tracks
+    print(f"Found {len(unique_track_ids)} unique tracks in total.")
+    return tracks_by_artist
 
 def main():
     load_dotenv()
@@ -68,20 +75,11 @@ def main():
 
     client = SpotifyAPI(CLIENT_ID, CLIENT_SECRET, REDIRECT_URI)
     
-    all_tracks = get_all_user_tracks(client)
+    tracks_by_artist = get_all_user_tracks(client)
     
     # Get all genres from the user's library by batch fetching artist details
     print("Analyzing your library's genres...")
-    artist_genres_cache = {}
-    artist_ids = {track['artists'][0]['id'] for track in all_tracks if track and track.get('artists')}
-    
-    artist_id_list = list(artist_ids)
-    for i in range(0, len(artist_id_list), 50):
-        chunk = artist_id_list[i:i+50]
-        artists_details = client.sp_public.artists(chunk)['artists']
-        for artist in artists_details:
-            if artist:
-                artist_genres_cache[artist['id']] = artist.get('genres', [])
+    artist_genres_cache = fetch_artist_genres(client, tracks_by_artist.keys())
     
     user_genres = set()
     for genres in artist_genres_cache.values():
@@ -111,20 +109,21 @@ def main():
             chosen_genres = matched_genres
     
     # Filter songs by the chosen group of genres
-    genre_tracks = []
-    for track in all_tracks:
-        if track and track.get('artists'):
-            artist_id = track['artists'][0]['id']
-            artist_genres = artist_genres_cache.get(artist_id, [])
-            if any(genre in chosen_genres for genre in artist_genres):
-                genre_tracks.append(track)
-
-    if not genre_tracks:
+    # Sort keys (artist name, then popularity) are built in the same pass, one name lookup per artist
+    keyed_tracks = []
+    chosen_set = frozenset(chosen_genres)
+    for artist_id, artist_genres in artist_genres_cache.items():
+        if not chosen_set.isdisjoint(artist_genres) and tracks_by_artist[artist_id]:
+            artist_name = tracks_by_artist[artist_id][0]['artists'][0]['name']
+            keyed_tracks.extend(((artist_name, -t.get('popularity', 0)), t) for t in tracks_by_artist[artist_id])
+
+    if not keyed_tracks:
         print(f"No tracks found for the selected genres.")
         return
 
     # Sort tracks by artist, then by popularity
-    genre_tracks.sort(key=lambda t: (t['artists'][0]['name'], -t.get('popularity', 0)))
+    keyed_tracks.sort(key=itemgetter(0))
+    genre_tracks = [t for _, t in keyed_tracks]
     
     # Use the original search term for the playlist name
     playlist_name = f"{search_term.replace(' ', '_').capitalize()}_sb"
@@ -1,39 +1,364 @@
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth, SpotifyClientCredentials
+from spotipy.exceptions import SpotifyException
 from dotenv import load_dotenv
 import os
+import math
+from functools import cached_property
 import time
+import threading
+import requests
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from operator import itemgetter
+from genres import fetch_artist_genres
+from artist_cache import LRUGenreCache
+from metadata_cache import default_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib json module
+    orjson = None
+
+try:
+    import httpx
+except ImportError:  # optional: fall back to HTTP/1.1 through requests
+    httpx = None
 
 # Explicitly load .env from the script's directory to ensure it's always found.
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
 load_dotenv(dotenv_path=dotenv_path)
 
+SPOTIFY_API_URL = 'https://api.spotify.com/v1'
+# How many 100-track chunk requests may be in flight at once
+MAX_CONCURRENT_CHUNKS = 4
+
+# Playlist item fields that callers actually read; full track objects are ~10x larger
+PLAYLIST_ITEM_FIELDS = 'items(added_at,track(id,uri,name,popularity,artists(id,name),album(name))),total'
+
+# Sort key extractors for reorder_playlist; each takes a playlist item whose track is set
+_SORT_KEYS = {
+    'artist': lambda item: item['track'].get('artists', [{}])[0].get('name', ''),
+    'album': lambda item: item['track'].get('album', {}).get('name', ''),
+    'name': lambda item: item['track'].get('name', ''),
+    'added_at': lambda item: item.get('added_at', ''),
+    'popularity': lambda item: item['track'].get('popularity', 0),
+}
+
+def _reorder_moves(current, target, max_moves):
+    """
+    Greedily computes the range moves that turn the `current` URI order into `target`.
+
+    Returns:
+        list: (range_start, range_length, insert_before) tuples to apply in order,
+              or None if more than `max_moves` would be needed.
+    """
+    current = list(current)
+    moves = []
+    i = 0
+    while i < len(target):
+        if current[i] == target[i]:
+            i += 1
+            continue
+        if len(moves) == max_moves:
+            return None
+        # Move the longest run starting at target[i]'s current position that is already in target order
+        start = current.index(target[i], i)
+        length = 1
+        while start + length < len(current) and i + length < len(target) and current[start + length] == target[i + length]:
+            length += 1
+        moves.append((start, length, i))
+        current[i:i] = current[start:start + length]
+        del current[start + length:start + 2 * length]
+        i += length
+    return moves
+
+def _spotify_error(response):
+    """
+    Builds the SpotifyException spotipy raises for an HTTP error response, so raw requests
+    fail the same way as calls made through spotipy.
+    """
+    try:
+        error = response.json().get('error', {})
+        msg, reason = error.get('message'), error.get('reason')
+    except ValueError:
+        msg, reason = response.text or None, None
+    return SpotifyException(response.status_code, -1, f"{response.url}:\n {msg}",
+                            reason=reason, headers=response.headers)
+
+def _orjson_hook(response, *args, **kwargs):
+    """
+    Response hook that makes response.json() (which spotipy calls for every result) decode with orjson.
+    """
+    response.json = lambda **_: orjson.loads(response.content)
+    return response
+
+def _retry_after_seconds(value):
+    """
+    Parses a Retry-After header, which is either a number of seconds or an HTTP date.
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or malformed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class _Http2Session(requests.Session):
+    """
+    A requests.Session (so spotipy accepts it as requests_session) that sends every request
+    over one multiplexed HTTP/2 connection through httpx, and hands back requests.Response
+    objects. Retries 429/5xx and connection errors like the requests adapter, honoring Retry-After,
+    and raises requests.exceptions so callers' error handling works with either session.
+    Proxy environment variables are honored by httpx itself; explicit requests-style `proxies`
+    (e.g. spotipy's proxies argument) get their own client with matching proxy mounts.
+    """
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    MAX_RETRIES = 5
+    BACKOFF_FACTOR = 0.3
+    LIMITS = httpx.Limits(max_keepalive_connections=20) if httpx is not None else None
+
+    def __init__(self):
+        super().__init__()
+        # Raises ImportError if httpx was installed without the h2 extra
+        self._client = httpx.Client(http2=True, limits=self.LIMITS)
+        # Sorted proxies items -> httpx client routing through them
+        self._proxy_clients = {}
+        self._proxy_lock = threading.Lock()
+
+    def _client_for(self, proxies):
+        """Returns the httpx client to use for a requests-style proxies dict (scheme or 'all' -> URL)."""
+        proxies = {key: value for key, value in {**self.proxies, **(proxies or {})}.items() if value}
+        if not proxies:
+            return self._client
+        key = tuple(sorted(proxies.items()))
+        with self._proxy_lock:
+            client = self._proxy_clients.get(key)
+            if client is None:
+                # requests keys are 'http', 'https', 'all' or 'scheme://host'; httpx mounts want URL patterns
+                mounts = {
+                    (pattern if '://' in pattern else f'{pattern}://'): httpx.HTTPTransport(http2=True, proxy=proxy_url,
+                                                                                            limits=self.LIMITS)
+                    for pattern, proxy_url in proxies.items()
+                }
+                client = self._proxy_clients[key] = httpx.Client(http2=True, limits=self.LIMITS, mounts=mounts)
+        return client
+
+    def request(self, method, url, params=None, data=None, headers=None, timeout=None, json=None,
+                proxies=None, **kwargs):
+        # requests drops None-valued params; httpx would send them as empty strings
+        if params:
+            params = {key: value for key, value in params.items() if value is not None}
+        merged_headers = {**self.headers, **(headers or {})}
+        client = self._client_for(proxies)
+
+        for attempt in range(self.MAX_RETRIES + 1):
+            backoff = self.BACKOFF_FACTOR * 2 ** attempt
+            try:
+                response = client.request(method, url, params=params, content=data, json=json,
+                                          headers=merged_headers, timeout=timeout)
+            except httpx.TransportError as e:
+                if attempt == self.MAX_RETRIES:
+                    raise self._translate(e, url) from e
+                time.sleep(backoff)
+                continue
+            except httpx.HTTPError as e:
+                raise self._translate(e, url) from e
+            if response.status_code not in self.RETRY_STATUSES or attempt == self.MAX_RETRIES:
+                break
+            retry_after = _retry_after_seconds(response.headers.get('Retry-After'))
+            time.sleep(backoff if retry_after is None else retry_after)
+
+        result = requests.Response()
+        result.status_code = response.status_code
+        result.headers = requests.structures.CaseInsensitiveDict(response.headers)
+        result._content = response.content
+        result.encoding = response.encoding
+        result.url = str(response.url)
+        result.reason = response.reason_phrase
+        return requests.hooks.dispatch_hook('response', self.hooks, result)
+
+    @staticmethod
+    def _translate(error, url):
+        """Maps an httpx exception to the requests exception the HTTPAdapter would have raised."""
+        if isinstance(error, httpx.ConnectTimeout):
+            cls = requests.exceptions.ConnectTimeout
+        elif isinstance(error, httpx.ReadTimeout):
+            cls = requests.exceptions.ReadTimeout
+        elif isinstance(error, httpx.TimeoutException):
+            cls = requests.exceptions.Timeout
+        elif isinstance(error, httpx.TransportError):
+            cls = requests.exceptions.ConnectionError
+        else:
+            cls = requests.exceptions.RequestException
+        return cls(f'{error} ({url})')
+
+    def close(self):
+        self._client.close()
+        for client in self._proxy_clients.values():
+            client.close()
+        super().close()
+
+def _build_session():
+    """
+    Builds the keep-alive session shared by both spotipy clients: HTTP/2 through httpx when it is
+    installed, otherwise a pooled requests session. spotipy ignores its own retry settings when
+    given a session, so the retry logic lives on the session.
+    """
+    session = None
+    if httpx is not None:
+        try:
+            session = _Http2Session()
+        except ImportError:
+            pass
+    if session is None:
+        session = requests.Session()
+        retry = Retry(total=5, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=False, respect_retry_after_header=True)
+        session.mount('https://', HTTPAdapter(pool_connections=20, pool_maxsize=50, max_retries=retry))
+    if orjson is not None:
+        session.hooks['response'].append(_orjson_hook)
+    return session
+
+class TokenBucket:
+    """
+    Paces requests to `rate` per second on average, allowing bursts of up to `capacity`.
+    Callers only wait once the bucket runs dry. Thread-safe.
+    """
+    def __init__(self, rate=10, capacity=20):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Takes a token and returns how many seconds to wait before using it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self):
+        """
+        Blocks until a token is available.
+        """
+        time.sleep(self.reserve())
+
 class SpotifyAPI:
     def __init__(self, client_id, client_secret, redirect_uri, scope="playlist-modify-public user-library-read"):
         """
         Initializes the SpotifyAPI client with automatic retry logic.
         """
-        # The retry config now uses the correct 'status_forcelist' parameter.
-        retry_config = {
-            'retries': 5,
-            'status_forcelist': [429, 500, 502, 503, 504],
-            # 'status_retry_forcelist': [429, 500, 502, 503, 504]
-        }
-        
+        # One keep-alive session shared by both clients, so consecutive calls reuse connections
+        self._session = _build_session()
+
         self.sp_user = spotipy.Spotify(auth_manager=SpotifyOAuth(client_id=client_id,
                                                                   client_secret=client_secret,
                                                                   redirect_uri=redirect_uri,
-                                                                  scope=scope), **retry_config)
+                                                                  scope=scope), requests_session=self._session)
         self.sp_public = spotipy.Spotify(auth_manager=SpotifyClientCredentials(client_id=client_id,
-                                                                                client_secret=client_secret), **retry_config)
-        self.user_id = self.sp_user.me()['id']
+                                                                                client_secret=client_secret), requests_session=self._session)
+        # Track and artist objects persisted across runs; entries expire per the API's Cache-Control max-age
+        self._metadata = default_cache()
+        self._session.hooks['response'].append(self._metadata.observe_response)
+        # Artist genres are stable, so keep recent lookups in memory on top of the disk cache
+        self._artist_genres = LRUGenreCache(maxsize=4096, cache=self._metadata)
+        # playlist ID -> whether it is modifiable, so mutations don't re-fetch the name every time
+        self._modifiable_cache = {}
+        # Paces playlist writes below Spotify's rolling rate limit instead of sleeping after each one
+        self._bucket = TokenBucket(rate=10, capacity=20)
+        # One bounded pool for all follow-up page fetches and artist batches, however many run at once,
+        # so concurrent callers can't multiply past the session's connection pool
+        self._page_executor = ThreadPoolExecutor(max_workers=8)
+
+    @cached_property
+    def user_id(self):
+        """
+        The current user's ID, fetched on first use rather than at construction.
+        """
+        return self.sp_user.me()['id']
 
-    def _is_playlist_modifiable(self, playlist_id):
+    def close(self):
+        """
+        Closes the pooled HTTP session shared by both clients and the page-fetch pool.
+        """
+        self._page_executor.shutdown(cancel_futures=True)
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _send_chunks(self, method, url, payloads, concurrency=MAX_CONCURRENT_CHUNKS):
+        """
+        Sends one JSON request per payload to a Web API endpoint, with at most `concurrency` in flight.
+        With concurrency=1 the requests go out strictly in order.
+        Requests go through the shared session, so they are pooled (HTTP/2 when available) and
+        429/5xx responses are retried there; the token bucket paces them on top.
+        Failures raise SpotifyException, as spotipy's own calls do.
+        """
+        headers = {'Authorization': f"Bearer {self.sp_user.auth_manager.get_access_token(as_dict=False)}"}
+
+        def send(payload):
+            self._bucket.acquire()
+            try:
+                response = self._session.request(method, url, json=payload, headers=headers,
+                                                 timeout=self.sp_user.requests_timeout)
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                raise _spotify_error(e.response) from e
+            except requests.exceptions.RetryError as e:
+                raise SpotifyException(429, -1, f"{url}:\n Max Retries") from e
+            try:
+                return response.json()
+            except ValueError:
+                return None
+
+        # A single worker runs the payloads in submission order
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(send, payloads))
+
+    def _uri_chunks(self, track_ids, size=100):
+        """
+        Yields lists of up to `size` track URIs from a single ID or any iterable of IDs, URLs or URIs
+        (raw requests don't get spotipy's conversion). Duplicates are dropped, keeping the first occurrence.
+        """
+        if isinstance(track_ids, str):
+            track_ids = [track_ids]
+        # Dedup on the normalized URI, so an ID and its URI count as the same track
+        track_uris = iter(dict.fromkeys(self.sp_user._get_uri('track', track_id) for track_id in track_ids))
+        while chunk := list(islice(track_uris, size)):
+            yield chunk
+
+    def _is_playlist_modifiable(self, playlist_id, *, known_name=None):
         """
         Checks if a playlist is modifiable (i.e., its name ends with '_sb').
+        A name already in hand is checked locally; otherwise the name is only fetched
+        if the playlist hasn't been checked before.
         """
-        playlist = self.sp_public.playlist(playlist_id, fields='name')
-        return playlist['name'].endswith('_sb')
+        if known_name is not None:
+            return known_name.endswith('_sb')
+        if playlist_id not in self._modifiable_cache:
+            playlist_name = self.sp_public.playlist(playlist_id, fields='name')['name']
+            self._modifiable_cache[playlist_id] = playlist_name.endswith('_sb')
+        return self._modifiable_cache[playlist_id]
 
     def create_playlist(self, name, public=True, description=''):
         """
@@ -41,122 +366,163 @@ class SpotifyAPI:
         """
         if not name.endswith('_sb'):
             name += '_sb'
-        return self.sp_user.user_playlist_create(self.user_id, name, public, description)
+        playlist = self.sp_user.user_playlist_create(self.user_id, name, public, description)
+        self._modifiable_cache[playlist['id']] = True
+        return playlist
 
-    def add_song_to_playlist(self, playlist_id, track_ids):
+    def add_song_to_playlist(self, playlist_id, track_ids, concurrency=1, playlist_name=None):
         """
         Adds one or more songs to a playlist, only if it's modifiable.
+        With concurrency > 1, chunks are uploaded concurrently and may land out of order.
         """
-        if not self._is_playlist_modifiable(playlist_id):
+        if not self._is_playlist_modifiable(playlist_id, known_name=playlist_name):
             print(f"Playlist (ID: {playlist_id}) is not modifiable. It must end with '_sb'.")
             return None
-        if not isinstance(track_ids, list):
-            track_ids = [track_ids]
-        
+
         # Add tracks in chunks of 100 to avoid request size limits
-        for i in range(0, len(track_ids), 100):
-            chunk = track_ids[i:i+100]
-            self.sp_user.playlist_add_items(playlist_id, chunk)
-            time.sleep(0.5) # Add a small delay between chunk uploads
+        payloads = [{'uris': chunk} for chunk in self._uri_chunks(track_ids)]
+        self._send_chunks('POST', f'{SPOTIFY_API_URL}/playlists/{playlist_id}/tracks', payloads, concurrency)
         return True
 
-    def remove_song_from_playlist(self, playlist_id, track_ids):
+    def remove_song_from_playlist(self, playlist_id, track_ids, playlist_name=None):
         """
         Removes one or more songs from a playlist, only if it's modifiable.
         """
-        if not self._is_playlist_modifiable(playlist_id):
+        if not self._is_playlist_modifiable(playlist_id, known_name=playlist_name):
             print(f"Playlist (ID: {playlist_id}) is not modifiable. It must end with '_sb'.")
             return None
-        if not isinstance(track_ids, list):
-            track_ids = [track_ids]
-        
-        # Remove tracks in chunks of 100
-        for i in range(0, len(track_ids), 100):
-            chunk = track_ids[i:i+100]
-            self.sp_user.playlist_remove_all_occurrences_of_items(playlist_id, chunk)
-            time.sleep(0.5)
+
+        # Remove tracks in chunks of 100; removal order doesn't matter, so chunks go out concurrently
+        payloads = [{'tracks': [{'uri': uri} for uri in chunk]} for chunk in self._uri_chunks(track_ids)]
+        self._send_chunks('DELETE', f'{SPOTIFY_API_URL}/playlists/{playlist_id}/tracks', payloads)
         return True
 
-    def delete_playlist(self, playlist_id):
+    def delete_playlist(self, playlist_id, playlist_name=None):
         """
         Deletes a playlist, only if it's modifiable.
         """
-        if not self._is_playlist_modifiable(playlist_id):
+        if not self._is_playlist_modifiable(playlist_id, known_name=playlist_name):
             print(f"Playlist (ID: {playlist_id}) is not modifiable. It must end with '_sb'.")
             return None
-        return self.sp_user.current_user_unfollow_playlist(playlist_id)
+        result = self.sp_user.current_user_unfollow_playlist(playlist_id)
+        self._modifiable_cache.pop(playlist_id, None)
+        return result
 
-    def reorder_playlist(self, playlist_id, sort_key='artist', reverse=False):
+    def reorder_playlist(self, playlist_id, sort_key='artist', reverse=False, playlist_name=None):
         """
         Reorders a playlist based on a specified key.
         Sort keys can be 'artist', 'album', 'name', 'added_at', 'popularity'.
         """
-        if not self._is_playlist_modifiable(playlist_id):
+        if not self._is_playlist_modifiable(playlist_id, known_name=playlist_name):
             print(f"Playlist (ID: {playlist_id}) is not modifiable. It must end with '_sb'.")
             return None
 
-        items = self.list_songs(playlist_id=playlist_id)
-        
-        def get_sort_value(item):
-            track = item.get('track', {})
-            if not track: return '' # Handle cases where track is None
-            if sort_key == 'artist':
-                return track.get('artists', [{}])[0].get('name', '')
-            elif sort_key == 'album':
-                return track.get('album', {}).get('name', '')
-            elif sort_key == 'name':
-                return track.get('name', '')
-            elif sort_key == 'added_at':
-                return item.get('added_at', '')
-            elif sort_key == 'popularity':
-                return track.get('popularity', 0)
-            return ''
-
-        items.sort(key=get_sort_value, reverse=reverse)
-        
-        track_uris = [item['track']['uri'] for item in items if item.get('track')]
-        if not track_uris:
+        # One pass over the streamed items keeps just (sort key, uri) pairs, not the item dicts
+        get_sort_value = _SORT_KEYS.get(sort_key, lambda item: '')
+        pairs = []
+        item_count = 0
+        for item in self.iter_songs(playlist_id=playlist_id, fields='items(added_at,track(uri,name,popularity,artists(name),album(name))),total'):
+            item_count += 1
+            if item.get('track'): # Skip items whose track is None
+                pairs.append((get_sort_value(item), item['track']['uri']))
+        if not pairs:
             return None
 
-        # Re-ordering is done by replacing the first 100, then adding the rest.
-        self.sp_user.playlist_replace_items(playlist_id, track_uris[:100])
-        time.sleep(0.5)
-        for i in range(100, len(track_uris), 100):
-            chunk = track_uris[i:i+100]
-            self.sp_user.playlist_add_items(playlist_id, chunk)
-            time.sleep(0.5)
+        current_uris = [uri for _, uri in pairs]
+        pairs.sort(key=itemgetter(0), reverse=reverse)
+        track_uris = [uri for _, uri in pairs]
+        del pairs
+
+        # Prefer in-place range moves when they cost no more requests than the ceil(N/100)-request
+        # rewrite below. Items without a track still hold a position, so moves are only computed
+        # when every item has one.
+        max_moves = math.ceil(len(track_uris) / 100)
+        moves = _reorder_moves(current_uris, track_uris, max_moves) if len(current_uris) == item_count else None
+        if moves is not None:
+            for range_start, range_length, insert_before in moves:
+                self._bucket.acquire()
+                self.sp_user.playlist_reorder_items(playlist_id, range_start, insert_before, range_length=range_length)
+            return True
+
+        # Otherwise re-ordering is done by replacing the first 100, then adding the rest in order.
+        url = f'{SPOTIFY_API_URL}/playlists/{playlist_id}/tracks'
+        self._send_chunks('PUT', url, [{'uris': track_uris[:100]}], concurrency=1)
+        try:
+            self._send_chunks('POST', url, [{'uris': track_uris[i:i+100]} for i in range(100, len(track_uris), 100)], concurrency=1)
+        except (SpotifyException, requests.RequestException) as e:
+            # Retries are exhausted at this point; say plainly that the playlist is now truncated
+            raise RuntimeError(f"Reordering playlist {playlist_id} failed after its first 100 tracks were "
+                               f"replaced; {len(track_uris) - 100} tracks were not re-added: {track_uris[100:]}") from e
         return True
 
-    def list_songs(self, playlist_id=None):
+    def list_songs(self, playlist_id=None, fields=PLAYLIST_ITEM_FIELDS):
         """
         Lists song items from a specific playlist or from the user's "Liked Songs".
         Each item includes the track object and metadata like 'added_at'.
+        For playlists, only the given `fields` are requested (None for full track objects).
         """
-        all_items = []
+        return list(self.iter_songs(playlist_id=playlist_id, fields=fields))
+
+    def iter_songs(self, playlist_id=None, fields=PLAYLIST_ITEM_FIELDS):
+        """
+        Yields song items from a specific playlist or from the user's "Liked Songs"
+        page by page, so callers can process them as they arrive or stop early.
+        """
+        # The first page reveals the total, after which the remaining pages are fetched concurrently
         if playlist_id:
-            results = self.sp_user.playlist_items(playlist_id)
+            page_size = 100
+            fetch_page = lambda offset: self.sp_user.playlist_items(playlist_id, fields=fields, limit=page_size, offset=offset)
         else:
-            results = self.sp_user.current_user_saved_tracks()
+            page_size = 50 # The saved tracks endpoint caps limit at 50
+            fetch_page = lambda offset: self.sp_user.current_user_saved_tracks(limit=page_size, offset=offset)
+
+        first_page = fetch_page(0)
+        yield from first_page['items']
 
-        while results:
-            all_items.extend(results['items'])
-            if results['next'] and hasattr(self.sp_user, 'next'):
-                results = self.sp_user.next(results)
-            else:
-                results = None
-        return all_items
+        futures = [self._page_executor.submit(fetch_page, offset) for offset in range(page_size, first_page['total'], page_size)]
+        try:
+            for future in futures:
+                yield from future.result()['items']
+        finally:
+            # Don't keep fetching pages nobody will read if the caller stopped early
+            for future in futures:
+                future.cancel()
+
+    def iter_playlists(self):
+        """
+        Yields every playlist of the current user, following pagination.
+        """
+        next_page = self.sp_user.next # Resolved once rather than per page
+        page = self.sp_user.current_user_playlists()
+        while page:
+            yield from page['items']
+            page = next_page(page) if page.get('next') else None
 
     def get_song_genre(self, song_id):
         """
         Retrieves the genres of a song's primary artist.
         """
-        track_info = self.sp_public.track(song_id)
-        if not track_info or not track_info['artists']:
-            return []
-        
-        artist_id = track_info['artists'][0]['id']
-        artist_info = self.sp_public.artist(artist_id)
-        return artist_info.get('genres', [])
+        return self.get_song_genres_bulk([song_id])[song_id]
+
+    def get_song_genres_bulk(self, song_ids):
+        """
+        Retrieves the genres of each song's primary artist, using the bulk
+        tracks (50 per request) and artists endpoints. Both lookups are cached on disk.
+
+        Returns:
+            dict: A mapping of each given song ID to its primary artist's genres.
+        """
+        song_ids = list(song_ids)
+        primary_artist_ids = {}
+        tracks = self._metadata.get_many_or_fetch('tracks', song_ids, lambda chunk: self.sp_public.tracks(chunk)['tracks'])
+        for song_id, track_info in tracks.items():
+            if track_info and track_info['artists']:
+                primary_artist_ids[song_id] = track_info['artists'][0]['id']
+
+        # Artist batches share the client's bounded pool instead of spinning up a new one per call
+        artist_genres = fetch_artist_genres(self, primary_artist_ids.values(), cache=self._artist_genres,
+                                            executor=self._page_executor)
+        return {song_id: artist_genres.get(primary_artist_ids.get(song_id), []) for song_id in song_ids}
 
     def list_available_genres(self):
         """
@@ -168,7 +534,7 @@ class SpotifyAPI:
         """
         Retrieves metadata for a song.
         """
-        return self.sp_public.track(song_id)
+        return self._metadata.get_or_fetch('tracks', song_id, self.sp_public.track)
 
     def search_song(self, query, search_type='track', limit=10):
         """
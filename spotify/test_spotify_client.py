@@ -1,6 +1,14 @@
 import unittest
 import os
-from spotify_client import SpotifyAPI
+import random
+import time
+import types
+from email.utils import formatdate
+from unittest import mock
+import requests
+import spotipy
+from spotipy.exceptions import SpotifyException
+from spotify_client import SpotifyAPI, TokenBucket, _reorder_moves, _retry_after_seconds
 from dotenv import load_dotenv
 
 class TestSpotifyAPI(unittest.TestCase):
@@ -89,21 +97,103 @@ class TestSpotifyAPI(unittest.TestCase):
         self.spotify_client.add_song_to_playlist(self.playlist_id, [self.song_id])
         print("Added song to playlist.")
 
-        song_items = self.spotify_client.list_songs(playlist_id=self.playlist_id)
-        song_ids_in_playlist = [item['track']['id'] for item in song_items if item and item.get('track')]
-        self.assertIn(self.song_id, song_ids_in_playlist)
+        song_items = self.spotify_client.iter_songs(playlist_id=self.playlist_id)
+        self.assertTrue(any(item['track']['id'] == self.song_id for item in song_items if item and item.get('track')))
         print("Verified song was added to playlist.")
 
         self.spotify_client.remove_song_from_playlist(self.playlist_id, [self.song_id])
         print("Removed song from playlist.")
         
         song_items_after_removal = self.spotify_client.list_songs(playlist_id=self.playlist_id)
-        song_ids_after_removal = [item['track']['id'] for item in song_items_after_removal if item and item.get('track')]
+        song_ids_after_removal = {item['track']['id'] for item in song_items_after_removal if item and item.get('track')}
         self.assertNotIn(self.song_id, song_ids_after_removal)
         print("Verified song was removed from playlist.")
 
         self.spotify_client.delete_playlist(self.playlist_id)
         print("Deleted the test playlist.")
 
+class TestPlaylistHelpers(unittest.TestCase):
+    """
+    Offline tests for the pure helpers behind playlist writes; no credentials needed.
+    """
+
+    @staticmethod
+    def apply_moves(uris, moves):
+        """Applies (range_start, range_length, insert_before) moves the way the reorder endpoint does."""
+        uris = list(uris)
+        for range_start, range_length, insert_before in moves:
+            block = uris[range_start:range_start + range_length]
+            del uris[range_start:range_start + range_length]
+            if insert_before > range_start:
+                insert_before -= range_length
+            uris[insert_before:insert_before] = block
+        return uris
+
+    def test_reorder_moves_reproduce_target(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            current = [f"spotify:track:{rng.randint(0, 15)}" for _ in range(rng.randint(0, 40))]
+            target = sorted(current) if rng.random() < 0.5 else rng.sample(current, len(current))
+            moves = _reorder_moves(current, target, max_moves=len(current))
+            self.assertEqual(self.apply_moves(current, moves), target)
+
+    def test_reorder_moves_single_run(self):
+        self.assertEqual(_reorder_moves(list('abcdef'), list('abdefc'), max_moves=1), [(3, 3, 2)])
+        self.assertEqual(_reorder_moves(list('abc'), list('abc'), max_moves=0), [])
+
+    def test_reorder_moves_gives_up_over_budget(self):
+        self.assertIsNone(_reorder_moves(list('abcd'), list('dcba'), max_moves=1))
+
+    def test_token_bucket_timing(self):
+        with mock.patch('spotify_client.time.monotonic', return_value=100.0):
+            bucket = TokenBucket(rate=10, capacity=3)
+            # The burst is free, then each extra token costs 1/rate seconds more
+            waits = [bucket.reserve() for _ in range(5)]
+        self.assertEqual(waits[:3], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(waits[3], 0.1)
+        self.assertAlmostEqual(waits[4], 0.2)
+
+        # Tokens refill with elapsed time, capped at capacity
+        with mock.patch('spotify_client.time.monotonic', return_value=200.0):
+            self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+            self.assertAlmostEqual(bucket.reserve(), 0.1)
+
+    def test_uri_chunks_dedup_and_order(self):
+        client = types.SimpleNamespace(sp_user=spotipy.Spotify())
+        ids = [f"{i:022d}" for i in range(250)]
+        # Duplicates given as IDs and as URIs are dropped, keeping first-seen order
+        track_ids = (x for x in ids + [f"spotify:track:{ids[0]}", ids[5]])
+        chunks = list(SpotifyAPI._uri_chunks(client, track_ids))
+        self.assertEqual([len(chunk) for chunk in chunks], [100, 100, 50])
+        self.assertEqual([uri for chunk in chunks for uri in chunk], [f"spotify:track:{i}" for i in ids])
+
+    def test_uri_chunks_single_id(self):
+        client = types.SimpleNamespace(sp_user=spotipy.Spotify())
+        self.assertEqual(list(SpotifyAPI._uri_chunks(client, "0" * 22)), [["spotify:track:" + "0" * 22]])
+
+    def test_retry_after_seconds(self):
+        self.assertEqual(_retry_after_seconds("3"), 3.0)
+        self.assertAlmostEqual(_retry_after_seconds(formatdate(time.time() + 10, usegmt=True)), 10, delta=1.5)
+        self.assertEqual(_retry_after_seconds(formatdate(0, usegmt=True)), 0.0)
+        self.assertIsNone(_retry_after_seconds("soon"))
+        self.assertIsNone(_retry_after_seconds(None))
+
+    def test_send_chunks_raises_spotify_exception(self):
+        response = requests.Response()
+        response.status_code = 403
+        response.url = 'https://api.spotify.com/v1/playlists/x/tracks'
+        response._content = b'{"error": {"status": 403, "message": "Forbidden", "reason": "NOT_OWNER"}}'
+        session = mock.Mock()
+        session.request.return_value = response
+        client = types.SimpleNamespace(
+            sp_user=types.SimpleNamespace(auth_manager=mock.Mock(), requests_timeout=5),
+            _bucket=mock.Mock(), _session=session,
+        )
+        with self.assertRaises(SpotifyException) as ctx:
+            SpotifyAPI._send_chunks(client, 'POST', response.url, [{'uris': []}])
+        self.assertEqual(ctx.exception.http_status, 403)
+        self.assertEqual(ctx.exception.reason, 'NOT_OWNER')
+        self.assertIn('Forbidden', ctx.exception.msg)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file